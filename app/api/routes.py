@@ -1,11 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import asyncio
+import base64
+import functools
+import json
+import logging
+import time
+from datetime import datetime
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from typing import List, Optional
 from app.core.database import get_db, DatabaseInterface
-from app.models.faq import FAQ, FAQCreate, FAQUpdate, QueryLog
+from app.core.repository import FAQSnapshot
+from app.models.faq import DEFAULT_KB_ID, FAQ, FAQCreate, FAQUpdate, QueryLog
 from app.services.nlp_engine import nlp_engine
-from pydantic import BaseModel
+from app.services.batch_encoder import query_encoder
+from app.services.warmup import warm_up
+from app.services.query_cache import query_cache
+from app.services.text_utils import normalize_query
+from app.services.exact_match import ExactMatcher
+from app.services.knowledge_bases import KnowledgeBase, knowledge_bases
+from app.services.log_sink import log_sink
+from app.services.admission import Overloaded, chat_admission
+from app.services.log_rollups import log_retention
+from app.services.bulk_import import import_jobs, ingest, iter_csv, iter_lines, iter_ndjson, question_key
+from app.core.config import settings
+from app.services.metrics import chat_answers, chat_confidence, chat_errors, chat_request_seconds, chat_stage_seconds, registry
+from pydantic import BaseModel, Field
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class ChatRequest(BaseModel):
     query: str
@@ -14,94 +37,387 @@ class ChatResponse(BaseModel):
     answer: str
     confidence: float
 
+class BatchChatRequest(BaseModel):
+    queries: List[str]
+    k: int = Field(3, ge=1, le=20)
+    log: bool = False
+
+class Suggestion(BaseModel):
+    id: str
+    question: str
+    score: float
+
+class BatchChatItem(BaseModel):
+    query: str
+    corrected_query: str
+    answer: str
+    confidence: float
+    suggestions: List[Suggestion]
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem]
+
 class LoginRequest(BaseModel):
     username: str
     password: str
 
-import traceback
-
 from app.services.spell_checker import spell_corrector
 
+async def record_query(db: DatabaseInterface, log: QueryLog):
+    # Hand the log to the background writer; without it (no app lifecycle, e.g. scripts) write directly
+    if log_sink.running:
+        log_sink.submit(log)
+    else:
+        await db.log_query(log)
+
+KB_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+async def use_knowledge_base(kb_id: str = Query(DEFAULT_KB_ID, pattern=KB_ID_PATTERN)):
+    """
+    The knowledge base selected by `?kb_id=` (loaded on first use), pinned for the request.
+    """
+    kb = await knowledge_bases.acquire(kb_id)
+    try:
+        yield kb
+    finally:
+        knowledge_bases.release(kb)
+
+async def current_snapshot(kb: KnowledgeBase) -> FAQSnapshot:
+    """
+    FAQ snapshot, with the embedding index, spell-check vocabulary and exact-match table caught up to it.
+    Only changes made outside the API (seed scripts, other workers) need this full sync;
+    CRUD routes apply their change incrementally (see apply_faq_saved).
+    While another request is changing the index (a sync, CRUD route or bulk import batch),
+    this one does not wait for it: it ranks against the index as it is, and answers only
+    with FAQs still in the snapshot.
+    """
+    snapshot = await kb.repository.snapshot()
+    if kb.engine.corpus_version != snapshot.version and not kb.index_lock.locked():
+        snapshot = await sync_knowledge_base(kb)
+    return snapshot
+
+async def sync_knowledge_base(kb: KnowledgeBase) -> FAQSnapshot:
+    async with kb.index_lock:
+        snapshot = await kb.repository.snapshot()
+        if kb.engine.corpus_version == snapshot.version:
+            return snapshot  # caught up while we waited
+        faqs = snapshot.faqs()
+        stale, changed = kb.engine.sync_changes(faqs)  # only new/changed FAQs get encoded
+        embeddings = await encode_faqs(kb, changed)
+        for faq_id in stale:
+            kb.engine.remove_faq(faq_id)
+        if changed:
+            kb.engine.index_embeddings(changed, embeddings)
+        if kb is knowledge_bases.default:
+            spell_corrector.build_vocabulary(faqs)
+        kb.exact.build(faqs)
+        kb.engine.corpus_version = snapshot.version
+    return snapshot
+
+async def encode_faqs(kb: KnowledgeBase, faqs: List[FAQ]) -> Optional[np.ndarray]:
+    # FAQ encoding uses the default executor, so live chat queries keep the encoder thread.
+    # The index itself is only changed on the event loop, between rankings.
+    if not faqs:
+        return None
+    texts = [kb.engine.faq_text(faq) for faq in faqs]
+    return await asyncio.get_running_loop().run_in_executor(None, kb.engine.encode_bucketed, texts)
+
+async def apply_faq_saved(faq: FAQ, previous_version: int, kb: KnowledgeBase):
+    async with kb.index_lock:
+        in_sync = kb.engine.corpus_version == previous_version
+        # A sync that ran since the write may have indexed it already
+        if kb.engine.faq_texts.get(faq.id) != kb.engine.faq_text(faq):
+            kb.engine.index_embeddings([faq], await encode_faqs(kb, [faq]))
+        if kb is knowledge_bases.default:
+            spell_corrector.update_faq(faq)
+        kb.exact.update_faq(faq)
+        if in_sync:
+            kb.engine.corpus_version = kb.repository.version
+
+async def apply_faq_deleted(faq_id: str, previous_version: int, kb: KnowledgeBase):
+    async with kb.index_lock:
+        in_sync = kb.engine.corpus_version == previous_version
+        kb.engine.remove_faq(faq_id)
+        if kb is knowledge_bases.default:
+            spell_corrector.remove_faq(faq_id)
+        kb.exact.remove_faq(faq_id)
+        if in_sync:
+            kb.engine.corpus_version = kb.repository.version
+
+THRESHOLD = 0.65
+
+NO_KNOWLEDGE_ANSWER = "Sorry, I don't have enough knowledge to answer that yet."
+
+def exact_reply(text: str, snapshot: FAQSnapshot, matcher: ExactMatcher):
+    """
+    (answer text, confidence, outcome) if `text` is a canned intent or exactly an FAQ
+    question or alias (after normalization), else None.
+    """
+    match = matcher.lookup(text)
+    if match is None:
+        return None
+    if match.kind == "canned":
+        return match.value, 1.0, "greeting"
+    position = snapshot.positions.get(match.value)
+    if position is None:
+        return None
+    return snapshot.answers[position], 1.0, "hit"
+
+def valid_suggestions(ranking, snapshot: FAQSnapshot):
+    # Filter out very bad matches (e.g. score < 0.1) and FAQs deleted since the ranking
+    return [s for s in ranking.suggestions(min_score=0.1) if s[0] in snapshot]
+
+def answer_from_ranking(ranking, snapshot: FAQSnapshot):
+    """
+    (answer text, confidence, outcome) for a ranked query: the FAQ answer on a direct hit,
+    otherwise the top suggestions as a "did you mean" list.
+    """
+    match = ranking.best
+    if match and match[0] in snapshot:
+        # Direct hit
+        faq_id, score = match
+        return snapshot.answers[snapshot.positions[faq_id]], score, "hit"
+
+    # Fallback: Top 3 suggestions from the same ranking
+    suggestions = valid_suggestions(ranking, snapshot)
+    if suggestions:
+        return did_you_mean([faq_id for faq_id, sc in suggestions], snapshot), suggestions[0][1], "fallback"  # best guess
+    return "Sorry, I couldn't find any answer related to that. Can you try rephrasing?", 0.0, "no_answer"
+
+def did_you_mean(faq_ids: List[str], snapshot: FAQSnapshot) -> str:
+    list_text = "\n".join([f"- {snapshot.questions[snapshot.positions[faq_id]]}" for faq_id in faq_ids])
+    return f"I'm not 100% sure, but did you mean one of these?\n\n{list_text}"
+
+def lexical_reply(text: str, snapshot: FAQSnapshot, kb: KnowledgeBase):
+    """
+    Suggestions for a query shed before the model stage, from the BM25 index alone
+    (hybrid retrieval only). None when there is no index or no FAQ shares a word with it.
+    """
+    if kb.engine.lexical is None:
+        return None
+    ids, _ = kb.engine.lexical.search(text, 3)
+    ids = [faq_id for faq_id in ids if faq_id in snapshot]
+    return (did_you_mean(ids, snapshot), 0.0, "fallback") if ids else None
+
+async def answer_shed(db: DatabaseInterface, query: str, corrected_query: str, snapshot: FAQSnapshot,
+                      kb: KnowledgeBase, reason: str, started: float) -> ChatResponse:
+    # Degrade to the lexical answer, or tell the client to come back later
+    lexical = lexical_reply(corrected_query, snapshot, kb)
+    if lexical is None:
+        chat_answers.inc("shed")
+        chat_request_seconds.observe(time.perf_counter() - started)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"Too many requests in progress ({reason}), please retry",
+                            headers={"Retry-After": str(settings.CHAT_RETRY_AFTER_SECONDS)})
+    chat_admission.degraded += 1
+    answer, score, outcome = lexical
+    with chat_stage_seconds.time("log"):
+        await record_query(db, QueryLog(query=query, response=answer, score=score, outcome=outcome))
+    return observe_answer(ChatResponse(answer=answer, confidence=score), "degraded", started)
+
+def observe_answer(response: ChatResponse, outcome: str, started: float) -> ChatResponse:
+    chat_answers.inc(outcome)
+    if outcome in ("hit", "fallback", "no_answer"):
+        chat_confidence.observe(response.confidence)
+    chat_request_seconds.observe(time.perf_counter() - started)
+    return response
+
+async def answer_exactly(db: DatabaseInterface, query: str, exact, started: float) -> ChatResponse:
+    answer, score, outcome = exact
+    if outcome == "hit":
+        with chat_stage_seconds.time("log"):
+            await record_query(db, QueryLog(query=query, response=answer, score=score, outcome=outcome))
+    return observe_answer(ChatResponse(answer=answer, confidence=score), outcome, started)
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: DatabaseInterface = Depends(get_db)):
+async def chat(request: ChatRequest, db: DatabaseInterface = Depends(get_db),
+               kb: KnowledgeBase = Depends(use_knowledge_base)):
+    # Each stage is timed into chatbot_chat_stage_seconds (see /api/metrics)
+    started = time.perf_counter()
     try:
-        # Pre-process: Spell Correction
+        # Requests that arrive while the model is still warming up wait for it
+        with chat_stage_seconds.time("warmup"):
+            await warm_up.wait()
+
         original_query = request.query
-        corrected_query = spell_corrector.correct_text(original_query)
-        
-        # Log if correction happened (optional, for debug)
+
+        # 1. Current FAQ snapshot (in memory; the DB is only checked for outside changes now and then)
+        with chat_stage_seconds.time("fetch"):
+            snapshot = await current_snapshot(kb)
+
+        # Canned intents and FAQ questions/aliases typed exactly: one dict lookup, no model
+        with chat_stage_seconds.time("exact"):
+            exact = exact_reply(original_query, snapshot, kb.exact)
+        if exact is not None:
+            return await answer_exactly(db, original_query, exact, started)
+
+        # Repeated questions are answered straight from the cache (invalidated by FAQ changes)
+        with chat_stage_seconds.time("cache"):
+            cache_key = normalize_query(original_query)
+            cached = query_cache.get_response(cache_key, snapshot.version, kb.kb_id,
+                                              vocabulary=spell_corrector.vocabulary_version)
+        if cached is not None:
+            response, outcome = cached
+            with chat_stage_seconds.time("log"):
+                await record_query(db, QueryLog(query=original_query, response=response.answer,
+                                                score=response.confidence, outcome=outcome))
+            return observe_answer(response, outcome, started)
+
+        # Pre-process: Spell Correction
+        with chat_stage_seconds.time("spell"):
+            vocabulary = spell_corrector.vocabulary_version
+            corrected_query = spell_corrector.correct_text(original_query)
         if original_query != corrected_query:
-            print(f"Corrected '{original_query}' to '{corrected_query}'")
-
-        # Basic Greeting Logic
-        greetings = {
-            "hi": "Hello! How can I help you today?",
-            "hello": "Hi there! What can I do for you?",
-            "hey": "Hey! Need any help with campus info?",
-            "good morning": "Good morning! How can I assist you?",
-            "good afternoon": "Good afternoon! What's on your mind?",
-            "good evening": "Good evening! How can I help?",
-            "how are you": "I'm just a bot, but I'm functioning perfectly! How can I help you?",
-            "who are you": "I am the Student Support Bot. specialized in answering queries about the campus, exams, and facilities."
-        }
-        
-        clean_query = corrected_query.lower().strip("!?. ")
-        if clean_query in greetings:
-            return ChatResponse(answer=greetings[clean_query], confidence=1.0)
-
-        # 1. Fetch all FAQs
-        faqs = await db.get_all_faqs()
-        if not faqs:
-            return ChatResponse(answer="Sorry, I don't have enough knowledge to answer that yet.", confidence=0.0)
-
-        # 2. Extract content for matching (Question + Answer for better context)
-        corpus = [f"{faq.question} {faq.answer}" for faq in faqs]
-        questions_only = [faq.question for faq in faqs] # For display in fallback
-
-        # 3. Intelligent Match Logic
-        THRESHOLD = 0.65
-        
-        # A. Semantic Search on Corrected Query
-        match = nlp_engine.find_best_match(corrected_query, corpus, threshold=THRESHOLD)
-
-        response_text = ""
-        score = 0.0
-
-        if match:
-            # Direct hit
-            index, score = match
-            best_faq = faqs[index]
-            response_text = best_faq.answer
-        else:
-            # B. Fallback: Get Top 3 suggestions
-            suggestions = nlp_engine.find_closest_matches(corrected_query, corpus, k=3)
-            
-            # Filter out very bad matches (e.g. score < 0.1)
-            valid_suggestions = [s for s in suggestions if s[1] > 0.1]
-            
-            if valid_suggestions:
-                list_text = "\n".join([f"- {questions_only[idx]}" for idx, sc in valid_suggestions])
-                response_text = f"I'm not 100% sure, but did you mean one of these?\n\n{list_text}"
-                score = valid_suggestions[0][1] # set score to best guess
-            else:
-                response_text = "Sorry, I couldn't find any answer related to that. Can you try rephrasing?"
+            logger.debug("Corrected %r to %r", original_query, corrected_query)
+
+        # Exact match again once typos are fixed ("helo" -> "hello")
+        if corrected_query != original_query:
+            with chat_stage_seconds.time("exact"):
+                exact = exact_reply(corrected_query, snapshot, kb.exact)
+            if exact is not None:
+                return await answer_exactly(db, original_query, exact, started)
 
-        # 4. Log the query
-        await db.log_query(QueryLog(query=original_query, response=response_text, score=score))
+        if not snapshot:
+            return observe_answer(ChatResponse(answer=NO_KNOWLEDGE_ANSWER, confidence=0.0), "no_knowledge", started)
 
-        return ChatResponse(answer=response_text, confidence=score)
+        # 2. Intelligent Match Logic
+        # A. Semantic Search on Corrected Query: one scoring pass yields the hit and the top 3 fallbacks
+        # Only a bounded number of requests encode and rank at once; the rest wait until their deadline
+        try:
+            async with chat_admission.admit(started + settings.CHAT_DEADLINE_SECONDS):
+                # Encoding runs off the event loop, batched with any concurrent queries
+                with chat_stage_seconds.time("encode"):
+                    embedding_key = normalize_query(corrected_query)
+                    query_embedding = query_cache.embeddings.get(embedding_key)
+                    if query_embedding is None:
+                        query_embedding = await query_encoder.encode(corrected_query)
+                        query_cache.embeddings.set(embedding_key, query_embedding)
+                with chat_stage_seconds.time("rank"):
+                    # While a write holds the index lock the index may lag the snapshot: answer, but don't cache
+                    cacheable = kb.engine.corpus_version == snapshot.version
+                    ranking = kb.engine.rank_embedding(query_embedding, k=3, threshold=THRESHOLD, text=corrected_query)
+                    response_text, score, outcome = answer_from_ranking(ranking, snapshot)
+        except Overloaded as e:
+            return await answer_shed(db, original_query, corrected_query, snapshot, kb, e.reason, started)
+
+        # 3. Log the query
+        with chat_stage_seconds.time("log"):
+            await record_query(db, QueryLog(query=original_query, response=response_text, score=score, outcome=outcome))
+
+        response = ChatResponse(answer=response_text, confidence=score)
+        if cacheable:
+            query_cache.put_response(cache_key, snapshot.version, (response, outcome), kb.kb_id, vocabulary=vocabulary)
+        return observe_answer(response, outcome, started)
+    except HTTPException:
+        raise
     except Exception as e:
-        traceback.print_exc()
+        chat_errors.inc()
+        logger.exception("Chat request failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest, db: DatabaseInterface = Depends(get_db),
+                     kb: KnowledgeBase = Depends(use_knowledge_base)):
+    """
+    Answers many queries in one call, with the same answers and confidences as /chat.
+    Queries are spell-corrected, encoded in one batch and scored with one matrix multiply;
+    each result also carries its top-k suggestions. Queries are only logged if `log` is set.
+    """
+    if len(request.queries) > settings.CHAT_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.CHAT_BATCH_MAX_QUERIES} queries per batch")
+    try:
+        await warm_up.wait()
+        snapshot = await current_snapshot(kb)
+
+        # Exact matches need no spell correction or model; the rest may still match once corrected
+        exact = [exact_reply(query, snapshot, kb.exact) for query in request.queries]
+        corrected = [query if reply is not None else spell_corrector.correct_text(query)
+                     for query, reply in zip(request.queries, exact)]
+        for i, query in enumerate(request.queries):
+            if exact[i] is None and corrected[i] != query:
+                exact[i] = exact_reply(corrected[i], snapshot, kb.exact)
+        ranked = [i for i, reply in enumerate(exact) if reply is None] if snapshot else []
+
+        # Encode each distinct query once, reusing cached embeddings
+        keys = [normalize_query(corrected[i]) for i in ranked]
+        texts = dict(zip(reversed(keys), (corrected[i] for i in reversed(ranked))))
+        embeddings = {key: query_cache.embeddings.get(key) for key in texts}
+        missing = [key for key, embedding in embeddings.items() if embedding is None]
+        if missing:
+            texts = [texts[key] for key in missing]
+            encoded = await asyncio.get_running_loop().run_in_executor(None, nlp_engine.encode_bucketed, texts)
+            for key, embedding in zip(missing, encoded):
+                embeddings[key] = embedding
+                query_cache.embeddings.set(key, embedding)
+
+        rankings = {}
+        if ranked:
+            query_embeddings = np.stack([embeddings[key] for key in keys])
+            k = max(request.k, 3)
+            # A large batch takes a while to score, so it runs off the event loop like the encoding
+            rank = functools.partial(kb.engine.rank_embeddings, query_embeddings, k=k, threshold=THRESHOLD,
+                                     texts=[corrected[i] for i in ranked])
+            rankings = dict(zip(ranked, await asyncio.get_running_loop().run_in_executor(None, rank)))
+
+        results, logs = [], []
+        for i, query in enumerate(request.queries):
+            ranking = rankings.get(i)
+            suggestions = []
+            if exact[i] is not None:
+                answer, score, outcome = exact[i]
+                if request.log and outcome == "hit":
+                    logs.append(QueryLog(query=query, response=answer, score=score, outcome=outcome))
+            elif ranking is None:
+                answer, score = NO_KNOWLEDGE_ANSWER, 0.0
+            else:
+                # The answer uses the same top 3 as /chat; suggestions may go deeper
+                answer, score, outcome = answer_from_ranking(ranking._replace(ids=ranking.ids[:3], scores=ranking.scores[:3]), snapshot)
+                suggestions = [
+                    Suggestion(id=faq_id, question=snapshot.questions[snapshot.positions[faq_id]], score=sc)
+                    for faq_id, sc in valid_suggestions(ranking, snapshot)[:request.k]
+                ]
+                if request.log:
+                    logs.append(QueryLog(query=query, response=answer, score=score, outcome=outcome))
+            results.append(BatchChatItem(query=query, corrected_query=corrected[i], answer=answer,
+                                         confidence=score, suggestions=suggestions))
+
+        if logs:
+            if log_sink.running:
+                for log in logs:
+                    log_sink.submit(log)
+            else:
+                await db.log_queries(logs)
+        return BatchChatResponse(results=results)
+    except Exception as e:
+        logger.exception("Batch chat request failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Conditional responses ---
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # Weak comparison (RFC 9110): W/ prefixes are ignored
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def conditional_json(request: Request, etag: str, content, headers: dict = None) -> Response:
+    """
+    304 without a body if the client already holds `etag`, else the JSON of `content()`.
+    The ETag is weak because the same data may also be sent gzip-encoded.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content(), headers=headers)
+
 @router.get("/suggested-questions", response_model=List[str])
-async def get_suggested_questions(db: DatabaseInterface = Depends(get_db)):
+async def get_suggested_questions(request: Request, kb: KnowledgeBase = Depends(use_knowledge_base)):
     # Return a random sample or fixed list of common questions
-    faqs = await db.get_all_faqs()
-    if not faqs:
-        return []
+    snapshot = await kb.repository.snapshot()
     # prioritizing checking existing faqs
-    return [faq.question for faq in faqs[:5]] # Return top 5 for chips
+    return conditional_json(request, f'W/"{snapshot.etag}"', lambda: snapshot.questions[:5])  # Return top 5 for chips
 
 from fastapi import Header
 
@@ -111,29 +427,200 @@ async def verify_token(authorization: str = Header(None)):
 
 # --- FAQ CRUD ---
 
+FAQ_FIELDS = ("id", "question", "answer", "aliases", "created_at", "updated_at")
+DEFAULT_PAGE_SIZE = 100
+
+def encode_cursor(key) -> str:
+    created_at, id = key
+    return base64.urlsafe_b64encode(json.dumps([created_at.isoformat(), id]).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/faqs", response_model=List[FAQ])
-async def get_faqs(db: DatabaseInterface = Depends(get_db)):
-    return await db.get_all_faqs()
+async def get_faqs(request: Request, limit: Optional[int] = Query(None, ge=1, le=1000), cursor: Optional[str] = None,
+                   fields: Optional[str] = None, kb: KnowledgeBase = Depends(use_knowledge_base)):
+    """
+    All FAQs, or one page of them when `limit` or `cursor` is given: pages follow
+    (created_at, id) order and the X-Next-Cursor header holds the cursor of the next page.
+    `fields` (comma-separated) projects the records. Served from the snapshot's
+    pre-serialized records; clients sending If-None-Match get 304 while the corpus is unchanged.
+    """
+    selected = FAQ_FIELDS
+    if fields:
+        selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+        unknown = set(selected) - set(FAQ_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    snapshot = await kb.repository.snapshot()
+    records = snapshot.records()
+    headers = {}
+    if limit is None and cursor is None:
+        positions = None
+    else:
+        positions, next_key = snapshot.page(decode_cursor(cursor) if cursor else None, limit or DEFAULT_PAGE_SIZE)
+        if next_key is not None:
+            headers["X-Next-Cursor"] = encode_cursor(next_key)
+
+    def content():
+        page = records if positions is None else [records[i] for i in positions]
+        if selected == FAQ_FIELDS:
+            return page
+        return [{field: record[field] for field in selected} for record in page]
+
+    return conditional_json(request, f'W/"{snapshot.etag}"', content, headers)
 
 @router.post("/faqs", response_model=FAQ, dependencies=[Depends(verify_token)])
-async def create_faq(faq: FAQCreate, db: DatabaseInterface = Depends(get_db)):
-    new_faq = FAQ(question=faq.question, answer=faq.answer)
-    return await db.add_faq(new_faq)
+async def create_faq(faq: FAQCreate, kb: KnowledgeBase = Depends(use_knowledge_base)):
+    new_faq = FAQ(kb_id=kb.kb_id, question=faq.question, answer=faq.answer, aliases=faq.aliases)
+    previous_version = kb.repository.version
+    created = await kb.repository.add_faq(new_faq)
+    await warm_up.wait()
+    await apply_faq_saved(created, previous_version, kb)
+    return created
 
 @router.put("/faqs/{faq_id}", response_model=FAQ, dependencies=[Depends(verify_token)])
-async def update_faq(faq_id: str, faq_data: FAQUpdate, db: DatabaseInterface = Depends(get_db)):
-    updated_faq = await db.update_faq(faq_id, faq_data.model_dump(exclude_unset=True))
+async def update_faq(faq_id: str, faq_data: FAQUpdate, kb: KnowledgeBase = Depends(use_knowledge_base)):
+    # FAQs of other knowledge bases are not found here
+    if await kb.repository.get_faq(faq_id) is None:
+        raise HTTPException(status_code=404, detail="FAQ not found")
+    previous_version = kb.repository.version
+    updated_faq = await kb.repository.update_faq(faq_id, faq_data.model_dump(exclude_unset=True))
     if not updated_faq:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    await warm_up.wait()
+    await apply_faq_saved(updated_faq, previous_version, kb)
     return updated_faq
 
 @router.delete("/faqs/{faq_id}", dependencies=[Depends(verify_token)])
-async def delete_faq(faq_id: str, db: DatabaseInterface = Depends(get_db)):
-    success = await db.delete_faq(faq_id)
+async def delete_faq(faq_id: str, kb: KnowledgeBase = Depends(use_knowledge_base)):
+    if await kb.repository.get_faq(faq_id) is None:
+        raise HTTPException(status_code=404, detail="FAQ not found")
+    previous_version = kb.repository.version
+    success = await kb.repository.delete_faq(faq_id)
     if not success:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    await warm_up.wait()
+    await apply_faq_deleted(faq_id, previous_version, kb)
     return {"status": "success"}
 
+# --- Bulk import ---
+
+@router.post("/faqs/bulk", dependencies=[Depends(verify_token)])
+async def bulk_import_faqs(request: Request, format: str = None, kb: KnowledgeBase = Depends(use_knowledge_base)):
+    """
+    Streams NDJSON (one {"question", "answer"} object per line) or CSV from the request body.
+    Rows are deduplicated by normalized question, inserted in batches with one DB write each,
+    and embedded in length-bucketed batches. Returns the job report; progress of a running
+    import can be polled at /faqs/bulk/jobs/{job_id}.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+
+    await warm_up.wait()
+    snapshot = await current_snapshot(kb)
+    existing_keys = {question_key(question) for question in snapshot.questions}
+
+    async def insert_batch(faqs: List[FAQ]):
+        for faq in faqs:
+            faq.kb_id = kb.kb_id
+        # Held from the write until the batch is indexed: chat requests meanwhile see the
+        # sync in progress and do not encode the batch a second time
+        async with kb.index_lock:
+            previous_version = kb.repository.version
+            created = await kb.repository.add_faqs(faqs)
+            if not created:
+                return
+            embeddings = await encode_faqs(kb, created)
+            in_sync = kb.engine.corpus_version == previous_version
+            kb.engine.index_embeddings(created, embeddings)
+            for faq in created:
+                if kb is knowledge_bases.default:
+                    spell_corrector.update_faq(faq)
+                kb.exact.update_faq(faq)
+            if in_sync:
+                kb.engine.corpus_version = kb.repository.version
+
+    job = import_jobs.create(format)
+    parse = iter_csv if format == "csv" else iter_ndjson
+    await ingest(job, parse(iter_lines(request.stream())), existing_keys, insert_batch,
+                 batch_size=settings.BULK_IMPORT_BATCH_SIZE)
+    return job.to_dict()
+
+@router.get("/faqs/bulk/jobs", dependencies=[Depends(verify_token)])
+async def bulk_import_jobs():
+    return [job.to_dict() for job in import_jobs.all()]
+
+@router.get("/faqs/bulk/jobs/{job_id}", dependencies=[Depends(verify_token)])
+async def bulk_import_job(job_id: str):
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return {**query_cache.stats(), "exact_match": knowledge_bases.default.exact.stats(),
+            "knowledge_bases": knowledge_bases.stats(), "admission": chat_admission.stats()}
+
+def service_metrics():
+    # Counters the components already keep, exported at scrape time
+    responses, embeddings = query_cache.responses, query_cache.embeddings
+    sink = log_sink.stats()
+    exact = knowledge_bases.default.exact.stats()
+    kbs = knowledge_bases.stats()
+    admission = chat_admission.stats()
+    return [
+        ("chatbot_response_cache_hits_total", "counter", "Chat answers served from the response cache.", responses.hits),
+        ("chatbot_response_cache_misses_total", "counter", "Response cache misses.", responses.misses),
+        ("chatbot_embedding_cache_hits_total", "counter", "Query embeddings served from cache.", embeddings.hits),
+        ("chatbot_embedding_cache_misses_total", "counter", "Query embedding cache misses.", embeddings.misses),
+        ("chatbot_encoder_batches_total", "counter", "Model calls made by the query encoder.", query_encoder.batches),
+        ("chatbot_encoder_queries_total", "counter", "Queries encoded by the query encoder.", query_encoder.encoded),
+        ("chatbot_log_queue_depth", "gauge", "Query logs waiting to be written.", sink["queued"]),
+        ("chatbot_logs_written_total", "counter", "Query logs written to the database.", sink["written"]),
+        ("chatbot_logs_dropped_total", "counter", "Query logs dropped because the queue was full.", sink["dropped"]),
+        ("chatbot_logs_purged_total", "counter", "Raw query logs deleted by the retention task.", log_retention.purged),
+        ("chatbot_faq_index_size", "gauge", "FAQs in the embedding index.", nlp_engine.index_size if nlp_engine.is_loaded else 0),
+        ("chatbot_exact_match_lookups_total", "counter", "Exact-match table lookups.", exact["lookups"]),
+        ("chatbot_exact_match_canned_hits_total", "counter", "Queries answered with a canned reply.", exact["hits"]["canned"]),
+        ("chatbot_exact_match_question_hits_total", "counter", "Queries that were exactly an FAQ question.",
+         exact["hits"]["question"]),
+        ("chatbot_exact_match_alias_hits_total", "counter", "Queries that were exactly an FAQ alias.", exact["hits"]["alias"]),
+        ("chatbot_knowledge_bases_resident", "gauge", "Non-default knowledge bases with a loaded index.", kbs["resident"]),
+        ("chatbot_knowledge_base_index_bytes", "gauge", "Size of the loaded non-default knowledge base indexes.",
+         kbs["resident_bytes"]),
+        ("chatbot_knowledge_base_loads_total", "counter", "Knowledge base index loads.", kbs["loads"]),
+        ("chatbot_knowledge_base_evictions_total", "counter", "Knowledge bases unloaded to stay in the memory budget.",
+         kbs["evictions"]),
+        ("chatbot_chat_active", "gauge", "Chat requests in the encode/rank stage.", admission["active"]),
+        ("chatbot_chat_queue_depth", "gauge", "Chat requests waiting for an encode/rank slot.", admission["queued"]),
+        ("chatbot_chat_shed_queue_full_total", "counter", "Chat requests shed because the admission queue was full.",
+         admission["shed"]["queue_full"]),
+        ("chatbot_chat_shed_deadline_total", "counter", "Chat requests shed at their deadline while queued.",
+         admission["shed"]["deadline"]),
+        ("chatbot_chat_degraded_total", "counter", "Shed chat requests answered from the lexical index.",
+         admission["degraded"]),
+        ("chatbot_hybrid_shortlist_total", "counter", "Hybrid rankings answered from the lexical shortlist.",
+         nlp_engine.hybrid_stats["shortlist"]),
+        ("chatbot_hybrid_full_scan_total", "counter", "Hybrid rankings that fell back to the full scan.",
+         nlp_engine.hybrid_stats["full_scan"]),
+    ]
+
+registry.register_collector(service_metrics)
+
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # --- Admin ---
 
 @router.post("/admin/login")
@@ -142,3 +629,13 @@ async def admin_login(creds: LoginRequest):
     if creds.username == "admin" and creds.password == "admin123":
         return {"token": "fake-jwt-token-for-mvp", "status": "success"}
     raise HTTPException(status_code=401, detail="Invalid credentials")
+
+@router.get("/admin/analytics", dependencies=[Depends(verify_token)])
+async def admin_analytics(hours: int = Query(24, ge=1, le=24 * 90), top: int = Query(10, ge=1, le=100),
+                          db: DatabaseInterface = Depends(get_db)):
+    """
+    Query volume and outcomes per hour, all-time totals, the confidence histogram and the
+    most frequent unanswered queries. Read from the rollups kept up to date as logs are
+    written, so the cost does not grow with the number of logs.
+    """
+    return await db.get_log_rollups(hours=hours, top=top)
@@ -5,8 +5,99 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "AI Student Query Chatbot"
     MONGO_URL: Optional[str] = "mongodb://localhost:27017"
     DATABASE_NAME: str = "student_chatbot"
+    # MongoDB connection pool (per worker process) and timeouts
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 0  # 0 = idle connections are kept
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 0  # 0 = no limit
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 0  # wait for a free pooled connection; 0 = no limit
+    MONGO_BATCH_SIZE: int = 1000  # documents per cursor round trip when loading FAQs
+    # Raw query logs expire through a TTL index on their timestamp; 0 = no TTL index
+    MONGO_LOG_TTL_DAYS: float = 0
     USE_JSON_DB: bool = False
     Json_DB_PATH: str = "data/db.json"
+    JSON_DB_COMPACT_EVERY: int = 1000  # journal entries between snapshot rewrites
+    JSON_DB_FSYNC: bool = False
+
+    # Query encoding: concurrent chat queries are coalesced into one model call
+    ENCODER_MAX_BATCH_SIZE: int = 32
+    ENCODER_MAX_WAIT_MS: float = 2.0
+
+    # A failed startup warm-up is retried after this long, doubling up to the maximum
+    WARMUP_RETRY_SECONDS: float = 5.0
+    WARMUP_RETRY_MAX_SECONDS: float = 300.0
+
+    # In-process FAQ snapshot: how often to check the DB for changes made outside this process
+    SNAPSHOT_REFRESH_SECONDS: float = 5.0
+
+    # Encoder backend: "torch" (float32 reference), "torch-int8" (dynamically quantized Linear
+    # layers) or "hash" (deterministic stand-in without model weights, for benchmarks)
+    ENCODER_BACKEND: str = "torch"
+    ENCODER_THREADS: int = 0  # PyTorch intra-op threads per process (0 = one per core; 1 in pool workers)
+    # Encode in this many long-lived worker processes holding the model (0 = in the API process)
+    INFERENCE_PROCESSES: int = 0
+
+    # Knowledge bases other than the default are loaded on first use; the least recently used
+    # are unloaded while their embedding indexes take more than this
+    KB_MEMORY_BUDGET_MB: float = 512
+
+    # Responses at least this large are gzip-compressed when the client accepts it
+    GZIP_MIN_SIZE: int = 1000
+
+    # /api/chat admission control: requests encoding and ranking at once (0 = no limit), requests
+    # waiting for a slot, and how long a request may wait before it is shed
+    CHAT_MAX_CONCURRENT: int = 64
+    CHAT_MAX_QUEUE: int = 256
+    CHAT_DEADLINE_SECONDS: float = 5.0
+    CHAT_RETRY_AFTER_SECONDS: int = 1  # Retry-After sent with 503s for shed requests
+
+    # Most queries accepted by one /chat/batch call
+    CHAT_BATCH_MAX_QUERIES: int = 1000
+
+    # Bulk FAQ import: rows per DB insert / embedding batch
+    BULK_IMPORT_BATCH_SIZE: int = 500
+
+    # Query logs are written in the background in batches; entries beyond the queue size are dropped
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 200
+    LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Raw query logs older than this are deleted (their counts stay in the rollups); 0 keeps them all
+    LOG_RETENTION_DAYS: float = 0
+    LOG_RETENTION_CHECK_SECONDS: float = 3600
+    # Distinct unanswered queries tracked by the JSON DB rollups
+    ROLLUP_MAX_UNANSWERED: int = 10000
+
+    # Query cache: normalized query -> embedding / final answer (0 disables a tier)
+    QUERY_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_SIZE: int = 10000
+    QUERY_CACHE_TTL_SECONDS: float = 3600
+
+    # Spell correction: symmetric-delete index over the FAQ vocabulary + the most common English words
+    SPELL_MAX_EDIT_DISTANCE: int = 2
+    SPELL_BASE_VOCAB_SIZE: int = 20000
+    SPELL_MEMO_SIZE: int = 50000
+
+    # FAQ vector index: "exact" (brute force) or "ivf" (approximate, for large corpora)
+    VECTOR_INDEX: str = "exact"
+    IVF_N_LISTS: int = 0  # 0 = sqrt(corpus size)
+    IVF_N_PROBE: int = 8  # cells scanned per query; higher = better recall, slower
+    IVF_MIN_TRAIN_SIZE: int = 10000  # below this the IVF index scans exactly
+    # In-memory precision of the exact index: "float32", "float16" or "int8"
+    EMBEDDING_PRECISION: str = "float32"
+    EMBEDDING_RERANK: int = 0  # top candidates rescored in float32 (0 = off)
+
+    # Retrieval: "semantic" scores every FAQ; "hybrid" scores only a BM25 shortlist and falls
+    # back to the full scan when the shortlist has no FAQ above the answer threshold
+    RETRIEVAL_MODE: str = "semantic"
+    HYBRID_SHORTLIST_SIZE: int = 200
+    HYBRID_MIN_CANDIDATES: int = 1  # fewer lexical candidates than this = full scan
+    # Weight of the (max-normalized) BM25 score in the ranking score; 0 keeps the plain cosine
+    HYBRID_LEXICAL_WEIGHT: float = 0.0
+
+    # On-disk FAQ embeddings reused across restarts and shared by workers ("" disables)
+    EMBEDDING_STORE_PATH: str = "data/embeddings"
     
     class Config:
         env_file = ".env"
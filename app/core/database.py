@@ -1,132 +1,455 @@
 import json
 import os
-from typing import List, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
 from app.core.config import settings
-from app.models.faq import FAQ, QueryLog
+from app.models.faq import DEFAULT_KB_ID, FAQ, QueryLog
+from app.services.log_rollups import LogRollups, hour_key, log_increments, log_time, summarize
 import asyncio
 
 class DatabaseInterface:
     async def connect(self): pass
     async def disconnect(self): pass
-    async def get_all_faqs(self) -> List[FAQ]: pass
+    # All FAQs, or those of one knowledge base
+    async def get_all_faqs(self, kb_id: Optional[str] = None) -> List[FAQ]: pass
     async def get_faq(self, id: str) -> Optional[FAQ]: pass
-    async def add_faq(self, faq: FAQ) -> FAQ: pass
-    async def update_faq(self, id: str, faq_data: dict) -> Optional[FAQ]: pass
-    async def delete_faq(self, id: str) -> bool: pass
+    # FAQ writes return their result and the FAQ version of its knowledge base they produced (None if
+    # they changed nothing). Every knowledge base has its own version, going up by exactly one per write
+    # to it, so a caller can tell whether someone else wrote to the same one in between.
+    # A batch given to add_faqs belongs to one knowledge base.
+    async def add_faq(self, faq: FAQ) -> Tuple[FAQ, Optional[int]]: pass
+    async def add_faqs(self, faqs: List[FAQ]) -> Tuple[List[FAQ], Optional[int]]: pass
+    async def update_faq(self, id: str, faq_data: dict) -> Tuple[Optional[FAQ], Optional[int]]: pass
+    async def delete_faq(self, id: str) -> Tuple[bool, Optional[int]]: pass
     async def log_query(self, log: QueryLog): pass
+    async def log_queries(self, logs: List[QueryLog]): pass
+    # Query analytics from the rollups kept up to date by log writes (see app/services/log_rollups.py)
+    async def get_log_rollups(self, hours: int = 24, top: int = 10) -> dict: pass
+    # Deletes raw logs older than `before` (they stay counted in the rollups); returns how many
+    async def purge_logs(self, before: datetime) -> int: return 0
+    # Counter bumped by every FAQ write to a knowledge base (None = unknown, always reload)
+    async def get_faq_version(self, kb_id: str = DEFAULT_KB_ID) -> Optional[int]: return None
+
+# FAQ documents as read by the API: Mongo's own _id is never needed
+FAQ_PROJECTION = {"_id": 0}
+
+def faq_version_id(kb_id: str) -> str:
+    # _id of a knowledge base's version document in the meta collection (the default one predates the others)
+    return "faqs" if kb_id == DEFAULT_KB_ID else f"faqs:{kb_id}"
+
+# Raised by create_index when an index on the same keys exists with other options
+INDEX_OPTIONS_CONFLICT = 85
 
 class MongoDatabase(DatabaseInterface):
     def __init__(self):
         self.client = None
         self.db = None
 
+    def client_options(self) -> dict:
+        options = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        }
+        # 0 means "no limit" here; the driver wants those left unset
+        for option, value in (("maxIdleTimeMS", settings.MONGO_MAX_IDLE_TIME_MS),
+                              ("socketTimeoutMS", settings.MONGO_SOCKET_TIMEOUT_MS),
+                              ("waitQueueTimeoutMS", settings.MONGO_WAIT_QUEUE_TIMEOUT_MS)):
+            if value:
+                options[option] = value
+        return options
+
     async def connect(self):
-        self.client = AsyncIOMotorClient(settings.MONGO_URL)
+        self.client = AsyncIOMotorClient(settings.MONGO_URL, **self.client_options())
         self.db = self.client[settings.DATABASE_NAME]
+        await self.create_indexes()
         print(f"Connected to MongoDB at {settings.MONGO_URL}")
 
+    async def create_indexes(self):
+        """
+        Indexes behind every lookup the API makes (create_index is a no-op for existing ones).
+        FAQ reads, updates and deletes go by `id`, which is unique.
+        """
+        await self.db.faqs.create_index("id", unique=True)
+        await self.db.faqs.create_index("kb_id")
+        await self.db.log_rollups.create_index("hour", unique=True)
+        await self.db.log_unanswered.create_index("query", unique=True)
+        await self.db.log_unanswered.create_index([("count", -1)])
+        await self._create_log_timestamp_index()
+
+    async def _create_log_timestamp_index(self):
+        # Serves retention purges; with MONGO_LOG_TTL_DAYS it also makes the server expire logs itself
+        options = {"name": "timestamp_1"}
+        if settings.MONGO_LOG_TTL_DAYS > 0:
+            options["expireAfterSeconds"] = int(settings.MONGO_LOG_TTL_DAYS * 86400)
+        try:
+            await self.db.logs.create_index([("timestamp", ASCENDING)], **options)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # The TTL setting changed since the index was made
+            await self.db.logs.drop_index("timestamp_1")
+            await self.db.logs.create_index([("timestamp", ASCENDING)], **options)
+
     async def disconnect(self):
         if self.client:
             self.client.close()
 
-    async def get_all_faqs(self) -> List[FAQ]:
-        faqs = []
-        async for doc in self.db.faqs.find():
-            faqs.append(FAQ(**doc))
-        return faqs
+    async def get_all_faqs(self, kb_id: Optional[str] = None) -> List[FAQ]:
+        query = {}
+        if kb_id is not None:
+            # FAQs stored before knowledge bases existed have no kb_id and belong to the default one
+            query = {"kb_id": {"$in": [kb_id, None]}} if kb_id == DEFAULT_KB_ID else {"kb_id": kb_id}
+        cursor = self.db.faqs.find(query, FAQ_PROJECTION).batch_size(settings.MONGO_BATCH_SIZE)
+        return [FAQ(**doc) async for doc in cursor]
 
     async def get_faq(self, id: str) -> Optional[FAQ]:
-        doc = await self.db.faqs.find_one({"id": id})
+        doc = await self.db.faqs.find_one({"id": id}, FAQ_PROJECTION)
         if doc:
             return FAQ(**doc)
         return None
 
-    async def add_faq(self, faq: FAQ) -> FAQ:
+    async def _bump_faq_version(self, kb_id: str) -> int:
+        doc = await self.db.meta.find_one_and_update({"_id": faq_version_id(kb_id)}, {"$inc": {"version": 1}},
+                                                     projection={"version": 1}, upsert=True,
+                                                     return_document=ReturnDocument.AFTER)
+        return doc["version"]
+
+    async def get_faq_version(self, kb_id: str = DEFAULT_KB_ID):
+        doc = await self.db.meta.find_one({"_id": faq_version_id(kb_id)}, {"version": 1})
+        return doc["version"] if doc else 0
+
+    async def add_faq(self, faq: FAQ) -> Tuple[FAQ, Optional[int]]:
         await self.db.faqs.insert_one(faq.model_dump())
-        return faq
+        return faq, await self._bump_faq_version(faq.kb_id)
 
-    async def update_faq(self, id: str, faq_data: dict) -> Optional[FAQ]:
-        result = await self.db.faqs.update_one({"id": id}, {"$set": faq_data})
-        if result.modified_count > 0:
-            return await self.get_faq(id)
-        return None
+    async def add_faqs(self, faqs: List[FAQ]) -> Tuple[List[FAQ], Optional[int]]:
+        if not faqs:
+            return faqs, None
+        await self.db.faqs.insert_many([faq.model_dump() for faq in faqs], ordered=False)
+        versions = {kb_id: await self._bump_faq_version(kb_id) for kb_id in dict.fromkeys(faq.kb_id for faq in faqs)}
+        return faqs, versions[faqs[0].kb_id]
 
-    async def delete_faq(self, id: str) -> bool:
-        result = await self.db.faqs.delete_one({"id": id})
-        return result.deleted_count > 0
+    async def update_faq(self, id: str, faq_data: dict) -> Tuple[Optional[FAQ], Optional[int]]:
+        if not faq_data:
+            return await self.get_faq(id), None
+        # One round trip: the document as it was tells both whether anything changed and the result
+        before = await self.db.faqs.find_one_and_update(
+            {"id": id}, {"$set": faq_data}, projection=FAQ_PROJECTION, return_document=ReturnDocument.BEFORE)
+        if before is None:
+            return None, None
+        version = None
+        if any(before.get(field) != value for field, value in faq_data.items()):
+            version = await self._bump_faq_version(before.get("kb_id") or DEFAULT_KB_ID)
+        return FAQ(**{**before, **faq_data}), version
+
+    async def delete_faq(self, id: str) -> Tuple[bool, Optional[int]]:
+        deleted = await self.db.faqs.find_one_and_delete({"id": id}, projection={"kb_id": 1})
+        if deleted is None:
+            return False, None
+        return True, await self._bump_faq_version(deleted.get("kb_id") or DEFAULT_KB_ID)
 
     async def log_query(self, log: QueryLog):
-        await self.db.logs.insert_one(log.model_dump())
+        await self.log_queries([log])
+
+    async def log_queries(self, logs: List[QueryLog]):
+        if logs:
+            docs = [log.model_dump() for log in logs]
+            await self.db.logs.insert_many(docs, ordered=False)
+            await self._update_rollups(docs)
+
+    async def _update_rollups(self, docs: List[dict]):
+        # One upserted $inc per hour touched, one for the all-time totals, one per unanswered query
+        hours, totals, unanswered = log_increments(docs)
+        ops = [UpdateOne({"hour": key}, {"$inc": dict(counts)}, upsert=True) for key, counts in hours.items()]
+        ops.append(UpdateOne({"hour": "all"}, {"$inc": dict(totals)}, upsert=True))
+        await self.db.log_rollups.bulk_write(ops, ordered=False)
+        if unanswered:
+            await self.db.log_unanswered.bulk_write(
+                [UpdateOne({"query": query}, {"$inc": {"count": count}}, upsert=True) for query, count in unanswered.items()],
+                ordered=False)
+
+    async def get_log_rollups(self, hours: int = 24, top: int = 10) -> dict:
+        now = datetime.utcnow()
+        keys = [hour_key(now - timedelta(hours=i)) for i in range(hours)]
+        docs = await self.db.log_rollups.find({"hour": {"$in": keys + ["all"]}}, {"_id": 0}).to_list(None)
+        by_hour = {doc.pop("hour"): doc for doc in docs}
+        totals = by_hour.pop("all", {})
+        cursor = self.db.log_unanswered.find({}, {"_id": 0}).sort("count", -1).limit(top)
+        unanswered = [(doc["query"], doc["count"]) async for doc in cursor]
+        return summarize(by_hour, totals, unanswered, now, hours)
+
+    async def purge_logs(self, before: datetime) -> int:
+        result = await self.db.logs.delete_many({"timestamp": {"$lt": before}})
+        return result.deleted_count
 
 class JsonDatabase(DatabaseInterface):
+    """
+    File-backed store for development and tests.
+
+    State is kept in memory. Every mutation is appended as one line to a JSONL journal
+    next to the snapshot (`data/db.json` -> `data/db.journal.jsonl`), so a write costs
+    one small append instead of rewriting the whole file. After JSON_DB_COMPACT_EVERY
+    journal entries the state is written to a new snapshot (atomically, via rename) and
+    the journal is truncated. Writes are serialized behind an asyncio lock.
+
+    Query-log rollups are updated as log entries are applied and saved with the snapshot;
+    snapshots from before rollups existed are backfilled from their logs once.
+
+    Writes made by other processes (e.g. the seed scripts) are picked up by checking the
+    snapshot and journal file stats before each operation.
+    """
+
     def __init__(self):
         self.file_path = settings.Json_DB_PATH
+        self.journal_path = os.path.splitext(self.file_path)[0] + ".journal.jsonl"
+        self._faqs: Dict[str, FAQ] = {}
+        self._logs: List[dict] = []
+        self._rollups = LogRollups(settings.ROLLUP_MAX_UNANSWERED)
+        self._loaded = False
+        self._snapshot_stamp = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._faq_versions: Counter = Counter()  # knowledge base -> FAQ version
+        self._compacting = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
         self._ensure_file()
 
     def _ensure_file(self):
         if not os.path.exists(os.path.dirname(self.file_path)):
             os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         if not os.path.exists(self.file_path):
-            with open(self.file_path, 'w') as f:
-                json.dump({"faqs": [], "logs": []}, f)
+            self._write_snapshot({"faqs": [], "logs": []})
 
-    def _read_data(self):
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio locks belong to one event loop; make a new one if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    # --- Snapshot + journal ---
+
+    def _stamp(self, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _write_snapshot(self, data: dict):
+        os.replace(self._write_tmp_snapshot(data), self.file_path)
+
+    def _write_tmp_snapshot(self, data: dict) -> str:
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, default=str)
+        return tmp_path
+
+    def _load(self):
         with open(self.file_path, 'r') as f:
-            return json.load(f)
+            data = json.load(f)
+        self._snapshot_stamp = self._stamp(self.file_path)
+        self._faqs = {item["id"]: FAQ(**item) for item in data.get("faqs", [])}
+        self._logs = data.get("logs", [])
+        if "rollups" in data:
+            self._rollups = LogRollups.from_dict(data["rollups"], settings.ROLLUP_MAX_UNANSWERED)
+        else:
+            self._rollups = LogRollups(settings.ROLLUP_MAX_UNANSWERED)
+            self._rollups.observe(self._logs)
+        self._faq_versions = Counter(data.get("faq_versions", {}))
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._replay_journal()
+        self._loaded = True
+
+    def _replay_journal(self):
+        """
+        Applies journal entries written after `_journal_offset`. A trailing line without a
+        newline is a write in progress (or a crash mid-write) and is left for later.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        complete = tail[:tail.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+                self._journal_entries += 1
+        self._journal_offset += len(complete)
+
+    def _refresh(self):
+        """
+        Cheap consistency check before each operation: reload if another process compacted
+        the snapshot, replay the journal tail if another process appended to it.
+        Skipped while this process compacts: its in-memory state is current then.
+        """
+        if self._compacting:
+            return
+        if not self._loaded or self._stamp(self.file_path) != self._snapshot_stamp:
+            self._load()
+            return
+        journal = self._stamp(self.journal_path)
+        journal_size = journal[2] if journal else 0
+        if journal_size < self._journal_offset:
+            self._load()
+        elif journal_size > self._journal_offset:
+            self._replay_journal()
+
+    def _apply(self, entry: dict):
+        op = entry["op"]
+        if op == "add_faq":
+            faq = FAQ(**entry["faq"])
+            self._faqs[faq.id] = faq
+            self._faq_versions[faq.kb_id] += 1
+        elif op == "add_faqs":
+            faqs = [FAQ(**item) for item in entry["faqs"]]
+            for faq in faqs:
+                self._faqs[faq.id] = faq
+            for kb_id in {faq.kb_id for faq in faqs}:
+                self._faq_versions[kb_id] += 1
+        elif op == "update_faq":
+            faq = self._faqs.get(entry["id"])
+            if faq:
+                self._faqs[faq.id] = FAQ(**{**faq.model_dump(), **entry["data"]})
+                self._faq_versions[faq.kb_id] += 1
+        elif op == "delete_faq":
+            faq = self._faqs.pop(entry["id"], None)
+            if faq:
+                self._faq_versions[faq.kb_id] += 1
+        elif op == "log":
+            self._logs.append(entry["log"])
+            self._rollups.observe([entry["log"]])
+        elif op == "purge_logs":
+            before = datetime.fromisoformat(entry["before"])
+            self._logs = [log for log in self._logs if log_time(log) >= before]
+
+    async def _commit(self, *entries: dict):
+        """
+        Applies entries in memory and appends them to the journal. Caller holds the lock.
+        """
+        for entry in entries:
+            self._apply(entry)
+        with open(self.journal_path, 'a') as f:
+            f.write("".join(json.dumps(entry, default=str) + "\n" for entry in entries))
+            f.flush()
+            if settings.JSON_DB_FSYNC:
+                os.fsync(f.fileno())
+            self._journal_offset = f.tell()
+        self._journal_entries += len(entries)
+        if self._journal_entries >= settings.JSON_DB_COMPACT_EVERY:
+            await self._compact()
 
-    def _write_data(self, data):
-        with open(self.file_path, 'w') as f:
-            json.dump(data, f, default=str, indent=2)
+    async def _compact(self):
+        """
+        Folds the journal into a fresh snapshot. Caller holds the lock, so state cannot
+        change while the snapshot is serialized in a worker thread.
+
+        The new snapshot is written to a temporary file first; renaming it over the old one,
+        truncating the journal and recording the new stamps then happen in one step with no
+        await in between, so no reader ever sees the new snapshot next to the old journal.
+        """
+        data = {"faqs": [faq.model_dump() for faq in self._faqs.values()], "logs": self._logs,
+                "rollups": self._rollups.to_dict(), "faq_versions": dict(self._faq_versions)}
+        self._compacting = True
+        try:
+            tmp_path = await asyncio.get_running_loop().run_in_executor(None, self._write_tmp_snapshot, data)
+            os.replace(tmp_path, self.file_path)
+            open(self.journal_path, 'w').close()
+            self._snapshot_stamp = self._stamp(self.file_path)
+            self._journal_offset = 0
+            self._journal_entries = 0
+        finally:
+            self._compacting = False
 
     async def connect(self):
+        self._refresh()
         print(f"Using JSON Database at {self.file_path}")
 
     async def disconnect(self):
-        pass
+        if self._loaded and self._journal_entries:
+            async with self._get_lock():
+                self._refresh()
+                await self._compact()
+
+    async def get_faq_version(self, kb_id: str = DEFAULT_KB_ID):
+        self._refresh()
+        return self._faq_versions[kb_id]
 
-    async def get_all_faqs(self) -> List[FAQ]:
-        data = self._read_data()
-        return [FAQ(**item) for item in data.get("faqs", [])]
+    async def get_all_faqs(self, kb_id: Optional[str] = None) -> List[FAQ]:
+        self._refresh()
+        if kb_id is None:
+            return list(self._faqs.values())
+        return [faq for faq in self._faqs.values() if faq.kb_id == kb_id]
 
     async def get_faq(self, id: str) -> Optional[FAQ]:
-        data = self._read_data()
-        for item in data.get("faqs", []):
-            if item["id"] == id:
-                return FAQ(**item)
-        return None
+        self._refresh()
+        return self._faqs.get(id)
 
-    async def add_faq(self, faq: FAQ) -> FAQ:
-        data = self._read_data()
-        data.setdefault("faqs", []).append(faq.model_dump())
-        self._write_data(data)
-        return faq
-
-    async def update_faq(self, id: str, faq_data: dict) -> Optional[FAQ]:
-        data = self._read_data()
-        faqs = data.get("faqs", [])
-        for i, item in enumerate(faqs):
-            if item["id"] == id:
-                item.update(faq_data)
-                faqs[i] = item
-                self._write_data(data)
-                return FAQ(**item)
-        return None
+    async def add_faq(self, faq: FAQ) -> Tuple[FAQ, Optional[int]]:
+        async with self._get_lock():
+            self._refresh()
+            await self._commit({"op": "add_faq", "faq": faq.model_dump()})
+            return faq, self._faq_versions[faq.kb_id]
+
+    async def add_faqs(self, faqs: List[FAQ]) -> Tuple[List[FAQ], Optional[int]]:
+        if not faqs:
+            return faqs, None
+        async with self._get_lock():
+            self._refresh()
+            # One journal entry, so the whole batch is one version
+            await self._commit({"op": "add_faqs", "faqs": [faq.model_dump() for faq in faqs]})
+            return faqs, self._faq_versions[faqs[0].kb_id]
 
-    async def delete_faq(self, id: str) -> bool:
-        data = self._read_data()
-        faqs = data.get("faqs", [])
-        new_faqs = [item for item in faqs if item["id"] != id]
-        if len(new_faqs) < len(faqs):
-            data["faqs"] = new_faqs
-            self._write_data(data)
-            return True
-        return False
+    async def update_faq(self, id: str, faq_data: dict) -> Tuple[Optional[FAQ], Optional[int]]:
+        async with self._get_lock():
+            self._refresh()
+            if id not in self._faqs:
+                return None, None
+            await self._commit({"op": "update_faq", "id": id, "data": faq_data})
+            faq = self._faqs[id]
+            return faq, self._faq_versions[faq.kb_id]
+
+    async def delete_faq(self, id: str) -> Tuple[bool, Optional[int]]:
+        async with self._get_lock():
+            self._refresh()
+            if id not in self._faqs:
+                return False, None
+            kb_id = self._faqs[id].kb_id
+            await self._commit({"op": "delete_faq", "id": id})
+            return True, self._faq_versions[kb_id]
 
     async def log_query(self, log: QueryLog):
-        data = self._read_data()
-        data.setdefault("logs", []).append(log.model_dump())
-        self._write_data(data)
+        await self.log_queries([log])
+
+    async def log_queries(self, logs: List[QueryLog]):
+        if not logs:
+            return
+        async with self._get_lock():
+            self._refresh()
+            await self._commit(*({"op": "log", "log": log.model_dump()} for log in logs))
+
+    async def get_log_rollups(self, hours: int = 24, top: int = 10) -> dict:
+        self._refresh()
+        return self._rollups.summary(datetime.utcnow(), hours, top)
+
+    async def purge_logs(self, before: datetime) -> int:
+        async with self._get_lock():
+            self._refresh()
+            purged = sum(1 for log in self._logs if log_time(log) < before)
+            if purged:
+                await self._commit({"op": "purge_logs", "before": before.isoformat()})
+            return purged
 
 db: DatabaseInterface = JsonDatabase() if settings.USE_JSON_DB else MongoDatabase()
 
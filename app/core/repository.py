@@ -0,0 +1,244 @@
+import asyncio
+import bisect
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.database import DatabaseInterface, db
+from app.models.faq import DEFAULT_KB_ID, FAQ
+
+class FAQSnapshot:
+    """
+    Immutable, columnar copy of one knowledge base's FAQs: parallel lists of ids, questions,
+    answers, aliases and timestamps, plus an id -> position map. Read paths use it instead of scanning the
+    database and building a pydantic FAQ per document on every request.
+    """
+
+    def __init__(self, version: int, ids: Sequence[str], questions: Sequence[str], answers: Sequence[str],
+                 created_at: Sequence[datetime], updated_at: Sequence[datetime], aliases: Sequence[List[str]],
+                 kb_id: str = DEFAULT_KB_ID):
+        self.version = version
+        self.kb_id = kb_id
+        self.ids = list(ids)
+        self.questions = list(questions)
+        self.answers = list(answers)
+        self.created_at = list(created_at)
+        self.updated_at = list(updated_at)
+        self.aliases = list(aliases)
+        self.positions: Dict[str, int] = {id: i for i, id in enumerate(self.ids)}
+        self._records: Optional[List[dict]] = None
+        self._etag: Optional[str] = None
+        self._sort_keys: Optional[List[Tuple[datetime, str]]] = None
+        self._sorted_positions: List[int] = []
+
+    @classmethod
+    def from_faqs(cls, version: int, faqs: Sequence[FAQ], kb_id: str = DEFAULT_KB_ID) -> "FAQSnapshot":
+        return cls(
+            version,
+            [faq.id for faq in faqs],
+            [faq.question for faq in faqs],
+            [faq.answer for faq in faqs],
+            [faq.created_at for faq in faqs],
+            [faq.updated_at for faq in faqs],
+            [faq.aliases for faq in faqs],
+            kb_id,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.positions
+
+    def faq(self, position: int) -> FAQ:
+        return FAQ.model_construct(
+            id=self.ids[position], kb_id=self.kb_id, question=self.questions[position], answer=self.answers[position],
+            created_at=self.created_at[position], updated_at=self.updated_at[position],
+            aliases=self.aliases[position],
+        )
+
+    def faqs(self) -> List[FAQ]:
+        """
+        Materializes FAQ objects (without validation). Only for rare paths such as index syncs.
+        """
+        return [self.faq(i) for i in range(len(self.ids))]
+
+    def records(self) -> List[dict]:
+        """
+        JSON-ready dicts for the FAQ listing, built once per snapshot.
+        """
+        if self._records is None:
+            self._records = [
+                {"id": id, "kb_id": self.kb_id, "question": q, "answer": a, "aliases": al,
+                 "created_at": c.isoformat(), "updated_at": u.isoformat()}
+                for id, q, a, al, c, u in zip(self.ids, self.questions, self.answers, self.aliases,
+                                              self.created_at, self.updated_at)
+            ]
+        return self._records
+
+    @property
+    def etag(self) -> str:
+        """
+        Hash of the corpus content, computed once per snapshot. Unlike `version` it is the
+        same in every worker and across restarts for the same FAQs, so it can be an HTTP ETag.
+        """
+        if self._etag is None:
+            digest = hashlib.blake2b(self.kb_id.encode(), digest_size=16)
+            for row in zip(self.ids, self.questions, self.answers, self.aliases, self.created_at, self.updated_at):
+                digest.update(repr(row).encode())
+            self._etag = digest.hexdigest()
+        return self._etag
+
+    def page(self, after: Optional[Tuple[datetime, str]], limit: int) -> Tuple[List[int], Optional[Tuple[datetime, str]]]:
+        """
+        Positions of up to `limit` FAQs in (created_at, id) order, starting after the key
+        `after`, plus the key to continue from (None on the last page). Keyset paging:
+        FAQs added or deleted between requests do not shift the following pages.
+        """
+        if self._sort_keys is None:
+            self._sorted_positions = sorted(range(len(self.ids)), key=lambda i: (self.created_at[i], self.ids[i]))
+            self._sort_keys = [(self.created_at[i], self.ids[i]) for i in self._sorted_positions]
+        start = bisect.bisect_right(self._sort_keys, after) if after is not None else 0
+        end = start + limit
+        next_key = self._sort_keys[end - 1] if end < len(self._sort_keys) else None
+        return self._sorted_positions[start:end], next_key
+
+    def with_faqs(self, version: int, faqs: Sequence[FAQ]) -> "FAQSnapshot":
+        """
+        Copy with `faqs` added, or replaced where the id is already present.
+        """
+        columns = [list(self.ids), list(self.questions), list(self.answers), list(self.created_at),
+                   list(self.updated_at), list(self.aliases)]
+        positions = dict(self.positions)
+        for faq in faqs:
+            values = [faq.id, faq.question, faq.answer, faq.created_at, faq.updated_at, faq.aliases]
+            position = positions.get(faq.id)
+            if position is None:
+                positions[faq.id] = len(columns[0])
+            for column, value in zip(columns, values):
+                if position is None:
+                    column.append(value)
+                else:
+                    column[position] = value
+        return FAQSnapshot(version, *columns, kb_id=self.kb_id)
+
+    def without_faq(self, version: int, id: str) -> "FAQSnapshot":
+        position = self.positions.get(id)
+        if position is None:
+            return self
+        columns = [self.ids, self.questions, self.answers, self.created_at, self.updated_at, self.aliases]
+        return FAQSnapshot(version, *[column[:position] + column[position + 1:] for column in columns], kb_id=self.kb_id)
+
+class FAQRepository:
+    """
+    Caching layer in front of DatabaseInterface for the FAQs of one knowledge base.
+
+    Holds the current FAQSnapshot. CRUD that goes through the repository updates the
+    snapshot directly (copy-on-write, so requests already holding the old one are not
+    affected); writes made elsewhere (seed scripts, other workers) are noticed by comparing
+    the database's version stamp of this knowledge base at most every SNAPSHOT_REFRESH_SECONDS,
+    so writes to other knowledge bases never cause a reload.
+    Every new snapshot gets a higher `version`, which caches key on.
+    """
+
+    def __init__(self, db: DatabaseInterface, refresh_seconds: float = 5.0, kb_id: str = DEFAULT_KB_ID):
+        self.db = db
+        self.kb_id = kb_id
+        self.refresh_seconds = refresh_seconds
+        self.version = 0
+        self._snapshot: Optional[FAQSnapshot] = None
+        self._db_version = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def snapshot(self) -> FAQSnapshot:
+        """
+        Current snapshot. Usually no I/O at all: the database is only asked for its
+        version stamp once the refresh interval has passed.
+        """
+        if self._snapshot is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return self._snapshot
+        async with self._get_lock():
+            if self._snapshot is None or time.monotonic() - self._checked_at >= self.refresh_seconds:
+                db_version = await self.db.get_faq_version(self.kb_id)
+                if self._snapshot is None or db_version is None or db_version != self._db_version:
+                    await self._reload(db_version)
+                self._checked_at = time.monotonic()
+        return self._snapshot
+
+    async def _reload(self, db_version) -> None:
+        faqs = await self.db.get_all_faqs(kb_id=self.kb_id)
+        self.version += 1
+        self._snapshot = FAQSnapshot.from_faqs(self.version, faqs, self.kb_id)
+        self._db_version = db_version
+
+    async def refresh(self) -> FAQSnapshot:
+        """
+        Forces a reload from the database.
+        """
+        async with self._get_lock():
+            await self._reload(await self.db.get_faq_version(self.kb_id))
+            self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def clear(self) -> None:
+        """
+        Drops the snapshot (e.g. when its knowledge base is unloaded); the next read reloads it.
+        """
+        self._snapshot = None
+
+    async def _after_write(self, build, db_version) -> None:
+        snapshot = self._snapshot or await self.snapshot()
+        self.version += 1
+        self._snapshot = build(snapshot)
+        if db_version is None:
+            return  # the write changed nothing in the database
+        if self._db_version is not None and db_version == self._db_version + 1:
+            # Only our own write moved the database version; record it so it does not trigger a reload
+            self._db_version = db_version
+        else:
+            # Someone else wrote too (another worker, a seed script): reload on the next read
+            self._db_version = None
+            self._checked_at = float("-inf")
+
+    async def get_faq(self, id: str) -> Optional[FAQ]:
+        snapshot = await self.snapshot()
+        position = snapshot.positions.get(id)
+        return snapshot.faq(position) if position is not None else None
+
+    async def add_faq(self, faq: FAQ) -> FAQ:
+        created, db_version = await self.db.add_faq(faq)
+        await self._after_write(lambda snapshot: snapshot.with_faqs(self.version, [created]), db_version)
+        return created
+
+    async def add_faqs(self, faqs: List[FAQ]) -> List[FAQ]:
+        created, db_version = await self.db.add_faqs(faqs)
+        if created:
+            await self._after_write(lambda snapshot: snapshot.with_faqs(self.version, created), db_version)
+        return created
+
+    async def update_faq(self, id: str, faq_data: dict) -> Optional[FAQ]:
+        updated, db_version = await self.db.update_faq(id, faq_data)
+        if updated:
+            await self._after_write(lambda snapshot: snapshot.with_faqs(self.version, [updated]), db_version)
+        return updated
+
+    async def delete_faq(self, id: str) -> bool:
+        deleted, db_version = await self.db.delete_faq(id)
+        if deleted:
+            await self._after_write(lambda snapshot: snapshot.without_faq(self.version, id), db_version)
+        return deleted
+
+repository = FAQRepository(db, refresh_seconds=settings.SNAPSHOT_REFRESH_SECONDS)
+
+def get_repository() -> FAQRepository:
+    return repository
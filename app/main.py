@@ -1,9 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.core.database import db
+from app.core.repository import repository
 from app.api import routes
+from app.services.batch_encoder import query_encoder
+from app.services.nlp_engine import nlp_engine
+from app.services.warmup import warm_up
+from app.services.log_sink import log_sink
+from app.services.log_rollups import log_retention
+import asyncio
 import os
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -16,17 +25,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+# Compress larger responses (e.g. the FAQ listing) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=6)
 
 # Startup/Shutdown events
 @app.on_event("startup")
 async def startup_db_client():
     await db.connect()
+    # Load models and embed the FAQ corpus in the background so the server can bind right away;
+    # CRUD routes keep the index up to date afterwards
+    warm_up.start(repository)
+    log_sink.start(db)
+    # Raw query logs past LOG_RETENTION_DAYS are deleted; the analytics rollups keep their counts
+    log_retention.start(db)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await warm_up.stop()
+    await query_encoder.stop()
+    # Stop inference worker processes (INFERENCE_PROCESSES) once no batch is using them
+    await asyncio.get_running_loop().run_in_executor(None, nlp_engine.close)
+    # Drain buffered query logs before the DB goes away
+    await log_retention.stop()
+    await log_sink.stop()
     await db.disconnect()
 
+# Probes: liveness only says the process is serving; readiness waits for the model and index
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    status = warm_up.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 # Mount API routes
 app.include_router(routes.router, prefix="/api")
 
@@ -3,24 +3,34 @@ from typing import Optional, List
 from datetime import datetime
 import uuid
 
+# Knowledge base of FAQs stored before knowledge bases existed, and of requests that name none
+DEFAULT_KB_ID = "default"
+
 class FAQ(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kb_id: str = DEFAULT_KB_ID
     question: str
     answer: str
+    # Other phrasings that should be answered with this FAQ when typed exactly
+    aliases: List[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class FAQCreate(BaseModel):
     question: str
     answer: str
+    aliases: List[str] = Field(default_factory=list)
 
 class FAQUpdate(BaseModel):
     question: Optional[str] = None
     answer: Optional[str] = None
+    aliases: Optional[List[str]] = None
 
 class QueryLog(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     query: str
     response: str
     score: float
+    # "hit", "fallback" or "no_answer" (None for logs written before outcomes were recorded)
+    outcome: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Deque
+from app.core.config import settings
+
+class Overloaded(Exception):
+    """
+    Raised by AdmissionControl.admit when a request is shed; `reason` is "queue_full" or "deadline".
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class AdmissionControl:
+    """
+    Bounded concurrency in front of the model stage of /api/chat.
+
+    At most `max_concurrent` requests encode and rank at once; up to `max_queue` more
+    wait, first come first served, until their deadline. A request arriving to a full
+    queue, or still waiting at its deadline, is shed at once instead of piling up behind
+    the encoder, so a spike costs a few fast rejections rather than every request timing
+    out. `max_concurrent` 0 admits everything.
+
+    Waiters are futures of the running loop, so nothing is bound to one event loop.
+    """
+
+    def __init__(self, max_concurrent: int = 64, max_queue: int = 256):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Stats
+        self.admitted = 0
+        self.shed: Counter = Counter()  # by reason
+        self.degraded = 0  # shed requests still answered from the lexical index
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def admit(self, deadline: float):
+        """
+        Holds a slot for the duration of the block. `deadline` is a time.perf_counter() value.
+        """
+        await self._acquire(deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, deadline: float) -> None:
+        if not self.max_concurrent or (self.active < self.max_concurrent and not self._waiters):
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed["queue_full"] += 1
+            raise Overloaded("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A released slot is handed over by resolving the future (active stays counted)
+            await asyncio.wait_for(asyncio.shield(waiter), max(0.0, deadline - time.perf_counter()))
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Handed a slot just as the deadline passed: pass it on
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            self.shed["deadline"] += 1
+            raise Overloaded("deadline")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        self.admitted += 1
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": {reason: self.shed[reason] for reason in ("queue_full", "deadline")},
+            "degraded": self.degraded,
+        }
+
+# Global instance
+chat_admission = AdmissionControl(settings.CHAT_MAX_CONCURRENT, settings.CHAT_MAX_QUEUE)
@@ -0,0 +1,134 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services.nlp_engine import nlp_engine
+
+class BatchEncoder:
+    """
+    Async front-end for the sentence encoder.
+
+    Queries awaiting `encode()` are queued; a worker task collects everything that
+    arrives within `max_wait_ms` (up to `max_batch_size`) and runs a single batched
+    encode call in an executor, so the event loop never blocks on the model.
+    Up to `max_in_flight` batches run at once (more than one only pays off when
+    encoding happens outside this process, see INFERENCE_PROCESSES).
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 32,
+                 max_wait_ms: float = 2.0, executor: Optional[Executor] = None, max_in_flight: int = 1):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+        self.executor = executor or ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="encoder")
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batches: set = set()
+
+        # Stats
+        self.batches = 0
+        self.encoded = 0
+
+    def _ensure_worker(self) -> None:
+        # The worker is bound to the loop it was started on; restart it if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._batches = set()
+            self._worker = loop.create_task(self._run())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """
+        Returns the normalized embedding of a single text.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes an already-batched list directly in the executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.encode_fn, texts)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free slot first, so queries keep piling into the next batch meanwhile
+            await self._slots.acquire()
+            batch: List[Tuple[str, asyncio.Future]] = []
+            try:
+                batch.append(await self._queue.get())
+                # Give concurrent requests a moment to join this batch
+                if self.max_wait and self._queue.qsize() < self.max_batch_size - 1:
+                    await asyncio.sleep(self.max_wait)
+            except asyncio.CancelledError:
+                # Stopped while collecting: these queries are off the queue, so stop() would not see them
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Encoder stopped"))
+                raise
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            task = loop.create_task(self._encode_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _encode_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            batch = [(text, future) for text, future in batch if not future.cancelled()]
+            if not batch:
+                return
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await asyncio.get_running_loop().run_in_executor(self.executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.batches += 1
+            self.encoded += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            self._slots.release()
+
+    async def stop(self) -> None:
+        """
+        Stops the worker task, lets batches already encoding finish and fails any queries still waiting.
+        """
+        if self._worker and not self._worker.done() and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            if self._batches:
+                await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._queue:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Encoder stopped"))
+        self._worker = None
+
+# Global instance
+query_encoder = BatchEncoder(
+    nlp_engine.encode,
+    max_batch_size=settings.ENCODER_MAX_BATCH_SIZE,
+    max_wait_ms=settings.ENCODER_MAX_WAIT_MS,
+    max_in_flight=max(1, settings.INFERENCE_PROCESSES),
+)
@@ -0,0 +1,190 @@
+import csv
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from app.models.faq import FAQ
+from app.services.text_utils import normalize_query
+
+# Per-row errors kept in a job report; the total is always counted
+MAX_REPORTED_ERRORS = 100
+
+def question_key(question: str) -> str:
+    """
+    Dedup key of a FAQ: hash of the normalized question, so case and punctuation variants collide.
+    """
+    return hashlib.sha1(normalize_query(question).encode("utf-8")).hexdigest()
+
+class ImportJob:
+    """
+    Progress and outcome of one bulk import.
+    """
+
+    def __init__(self, format: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.format = format
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.rows = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, row: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def finish(self, status: str = "done") -> None:
+        self.status = status
+        self.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "format": self.format,
+            "status": self.status,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "seconds": round(end - self.started_at, 3),
+        }
+
+class ImportJobs:
+    """
+    Running and recently finished jobs, so progress can be polled while an upload streams in.
+    """
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+
+    def create(self, format: str) -> ImportJob:
+        job = ImportJob(format)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.keep:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+    def all(self) -> List[ImportJob]:
+        return list(reversed(self._jobs.values()))
+
+# --- Parsing ---
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a byte stream into decoded lines without buffering more than one partial line.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+def parse_faq(data) -> FAQ:
+    if not isinstance(data, dict):
+        raise ValueError("expected an object with 'question' and 'answer'")
+    question = str(data.get("question") or "").strip()
+    answer = str(data.get("answer") or "").strip()
+    if not question or not answer:
+        raise ValueError("'question' and 'answer' are required")
+    return FAQ(question=question, answer=answer)
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yields (row number, FAQ or ValueError) for each non-empty NDJSON line.
+    """
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, parse_faq(json.loads(line))
+        except ValueError as e:
+            yield row, ValueError(str(e))
+
+async def iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yields (row number, FAQ or ValueError) for each CSV record. A header naming the
+    'question' and 'answer' columns is optional; without one the first two columns are used.
+    Quoted fields may span lines.
+    """
+    columns: Optional[Tuple[int, int]] = None
+    row = 0
+    record = ""
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        fields = next(csv.reader([text]))
+        if columns is None:
+            header = [f.strip().lower() for f in fields]
+            if "question" in header and "answer" in header:
+                columns = (header.index("question"), header.index("answer"))
+                continue
+            columns = (0, 1)
+        row += 1
+        try:
+            if len(fields) <= max(columns):
+                raise ValueError("expected 'question' and 'answer' columns")
+            yield row, parse_faq({"question": fields[columns[0]], "answer": fields[columns[1]]})
+        except ValueError as e:
+            yield row, ValueError(str(e))
+    if record:
+        row += 1
+        yield row, ValueError("unterminated quoted field")
+
+# --- Pipeline ---
+
+async def ingest(job: ImportJob, rows: AsyncIterator[Tuple[int, object]], existing_keys: set,
+                 insert_batch: Callable[[List[FAQ]], Awaitable[None]], batch_size: int = 500) -> ImportJob:
+    """
+    Dedups parsed rows against `existing_keys` (and each other) and hands them to
+    `insert_batch` `batch_size` at a time, updating `job` as it goes.
+    """
+    batch: List[FAQ] = []
+    try:
+        async for row, item in rows:
+            job.rows = row
+            if isinstance(item, Exception):
+                job.add_error(row, str(item))
+                continue
+            key = question_key(item.question)
+            if key in existing_keys:
+                job.skipped += 1
+                continue
+            existing_keys.add(key)
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await insert_batch(batch)
+                job.inserted += len(batch)
+                batch = []
+        if batch:
+            await insert_batch(batch)
+            job.inserted += len(batch)
+        job.finish()
+    except Exception as e:
+        job.add_error(job.rows, f"import aborted: {e}")
+        job.finish("failed")
+    return job
+
+# Global instance
+import_jobs = ImportJobs()
@@ -0,0 +1,109 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+from typing import Dict, List, Optional
+import numpy as np
+
+def content_hash(question: str, answer: str) -> str:
+    """
+    Key of a FAQ embedding: it only changes when the embedded text changes.
+    """
+    return hashlib.sha1(f"{question}\x1f{answer}".encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    FAQ embeddings persisted on disk, keyed by content hash.
+
+    Files share the `path` prefix:
+      <path>.json            manifest: model name, dimension and current generation
+      <path>-<gen>.npy       float32 matrix, one row per entry (opened as a read-only memory map)
+      <path>-<gen>.keys.npy  content hash of each row
+
+    A new generation is written next to the old one and the manifest is swapped last,
+    so readers never see a matrix and keys from different builds. Because the matrix is
+    memory-mapped read-only, every worker process on the host shares the same page-cache
+    pages instead of holding a private copy.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: int):
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.vectors: Optional[np.ndarray] = None
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    @property
+    def manifest_path(self) -> str:
+        return f"{self.path}.json"
+
+    def _data_paths(self, generation: str):
+        return f"{self.path}-{generation}.npy", f"{self.path}-{generation}.keys.npy"
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def load(self) -> bool:
+        """
+        Maps the store into memory. Returns False (leaving the store empty) if it is
+        missing, unreadable or was built with a different model.
+        """
+        self.vectors, self.keys, self.rows = None, [], {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("model") != self.model_name or manifest.get("dim") != self.dim:
+                print(f"Embedding store {self.path} was built for another model, ignoring it.")
+                return False
+            matrix_path, keys_path = self._data_paths(manifest["generation"])
+            vectors = np.load(matrix_path, mmap_mode="r")
+            keys = np.load(keys_path)
+        except (OSError, ValueError, KeyError):
+            return False
+
+        if vectors.shape != (len(keys), self.dim):
+            print(f"Embedding store {self.path} is inconsistent, ignoring it.")
+            return False
+        self.vectors = vectors
+        self.keys = [key.decode("ascii") for key in keys]
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        return True
+
+    def lookup(self, hashes: List[str]) -> List[Optional[int]]:
+        """
+        Row of each hash in the store, or None if it has to be encoded.
+        """
+        return [self.rows.get(h) for h in hashes]
+
+    def save(self, hashes: List[str], vectors: np.ndarray) -> None:
+        """
+        Writes a new generation, swaps the manifest atomically and removes older generations.
+        Processes that still map the old files keep reading them until they reload.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        generation = uuid.uuid4().hex[:12]
+        matrix_path, keys_path = self._data_paths(generation)
+        np.save(matrix_path, np.ascontiguousarray(vectors, dtype=np.float32))
+        np.save(keys_path, np.array([h.encode("ascii") for h in hashes], dtype="S40"))
+
+        manifest = {"model": self.model_name, "dim": self.dim, "count": len(hashes), "generation": generation}
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+        # Only this store's own generations: other stores may use `path` plus a suffix as their prefix
+        own = re.compile(re.escape(self.path) + r"-[0-9a-f]{12}(\.keys)?\.npy")
+        for old_path in glob.glob(f"{glob.escape(self.path)}-*.npy"):
+            if own.fullmatch(old_path) and old_path not in (matrix_path, keys_path):
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        self.load()
@@ -0,0 +1,97 @@
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from app.services.text_utils import normalize_query
+
+# Canned intents, answered without looking at the FAQs
+CANNED_RESPONSES = {
+    "hi": "Hello! How can I help you today?",
+    "hello": "Hi there! What can I do for you?",
+    "hey": "Hey! Need any help with campus info?",
+    "good morning": "Good morning! How can I assist you?",
+    "good afternoon": "Good afternoon! What's on your mind?",
+    "good evening": "Good evening! How can I help?",
+    "how are you": "I'm just a bot, but I'm functioning perfectly! How can I help you?",
+    "who are you": "I am the Student Support Bot. specialized in answering queries about the campus, exams, and facilities.",
+    "thanks": "You're welcome! Anything else I can help with?",
+    "thank you": "You're welcome! Anything else I can help with?",
+    "bye": "Goodbye! Good luck with your studies.",
+    "goodbye": "Goodbye! Good luck with your studies.",
+}
+
+class ExactMatch(NamedTuple):
+    kind: str   # "canned", "question" or "alias"
+    value: str  # the reply for canned intents, otherwise the FAQ id
+
+class ExactMatcher:
+    """
+    Dict from normalized text (see normalize_query) to a canned reply or an FAQ, covering
+    every FAQ question and admin-defined alias. A query typed exactly like one of them is
+    answered with one dict lookup, before spell correction, encoding or ranking.
+
+    Built from the corpus at startup and on full syncs, and updated per FAQ by the CRUD
+    routes. When several FAQs share a phrasing the first one indexed answers it; the others
+    are kept in line behind it, so removing it hands the phrasing to the next one.
+    """
+
+    def __init__(self, canned: Dict[str, str] = CANNED_RESPONSES):
+        self.canned = {normalize_query(text): reply for text, reply in canned.items()}
+        self.entries: Dict[str, ExactMatch] = {}
+        self.owners: Dict[str, List[ExactMatch]] = {}  # key -> every FAQ phrased that way, first indexed first
+        self.faq_keys: Dict[str, List[str]] = {}  # faq id -> its keys
+        self.hits: Counter = Counter()  # by kind
+        self.misses = 0
+
+    def build(self, faqs: Iterable) -> None:
+        self.entries, self.owners, self.faq_keys = {}, {}, {}
+        for faq in faqs:
+            self._add(faq)
+
+    def _add(self, faq) -> None:
+        keys = []
+        phrasings = [("question", faq.question)] + [("alias", alias) for alias in faq.aliases]
+        for kind, text in phrasings:
+            key = normalize_query(text)
+            if key and key not in keys:
+                owners = self.owners.setdefault(key, [])
+                owners.append(ExactMatch(kind, faq.id))
+                self.entries[key] = owners[0]
+                keys.append(key)
+        self.faq_keys[faq.id] = keys
+
+    def update_faq(self, faq) -> None:
+        self.remove_faq(faq.id)
+        self._add(faq)
+
+    def remove_faq(self, faq_id: str) -> None:
+        for key in self.faq_keys.pop(faq_id, ()):
+            owners = [match for match in self.owners[key] if match.value != faq_id]
+            if owners:
+                self.owners[key] = owners
+                self.entries[key] = owners[0]
+            else:
+                del self.owners[key]
+                del self.entries[key]
+
+    def lookup(self, text: str) -> Optional[ExactMatch]:
+        key = normalize_query(text)
+        reply = self.canned.get(key)
+        match = ExactMatch("canned", reply) if reply is not None else self.entries.get(key)
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits[match.kind] += 1
+        return match
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "canned": len(self.canned),
+            "lookups": lookups,
+            "hits": {kind: self.hits[kind] for kind in ("canned", "question", "alias")},
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+# Global instance
+exact_matcher = ExactMatcher()
@@ -0,0 +1,76 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+from app.services.encoders import create_encoder
+
+# --- Worker process side ---
+
+_encoder = None
+
+def _init_worker(backend: str, model_name: str, threads: int) -> None:
+    # Runs once per worker process: the model is loaded here and stays for the life of the process
+    global _encoder
+    _encoder = create_encoder(backend, model_name, threads=threads)
+    _encoder.load()
+
+def _describe() -> Tuple[int, str]:
+    return _encoder.dim, _encoder.cache_key
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return _encoder.encode(texts)
+
+# --- API process side ---
+
+class InferencePool:
+    """
+    Encoder backend that runs the model in a pool of long-lived worker processes.
+
+    Only the workers load the model, so API processes stay thin async front-ends and
+    encoding is not serialized behind one interpreter's GIL. Large inputs (index builds,
+    bulk imports) are split into chunks that the workers encode in parallel.
+
+    Scoring stays in the API process: it is one BLAS call that releases the GIL, over the
+    FAQ embeddings memory-mapped from the shared on-disk store, so sending it to a worker
+    would only add a round trip.
+    """
+    name = "pool"
+
+    def __init__(self, backend: str, model_name: str, processes: int, threads: int = 1, chunk_size: int = 256):
+        self.backend = backend
+        self.model_name = model_name
+        self.processes = processes
+        self.threads = threads
+        self.chunk_size = chunk_size
+        self.model = None
+        self.dim = 0
+        self.cache_key = model_name
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def load(self) -> None:
+        """
+        Starts the workers and waits until every one of them has loaded the model.
+        """
+        # "spawn": forking a process that may already hold torch threads or an event loop is unsafe
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.backend, self.model_name, self.threads),
+        )
+        # One task per worker, so they all start (and load the model) now rather than on first use
+        descriptions = [future.result() for future in [self.executor.submit(_describe) for _ in range(self.processes)]]
+        self.dim, self.cache_key = descriptions[0]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if len(texts) <= self.chunk_size:
+            return self.executor.submit(_encode, texts).result()
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        return np.concatenate(list(self.executor.map(_encode, chunks)))
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,147 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.database import db
+from app.core.repository import FAQRepository, repository
+from app.models.faq import DEFAULT_KB_ID
+from app.services.exact_match import ExactMatcher, exact_matcher
+from app.services.nlp_engine import NLPEngine, nlp_engine
+
+class KnowledgeBase:
+    """
+    One knowledge base: its FAQ repository (snapshot), embedding index and exact-match table.
+    """
+
+    def __init__(self, kb_id: str, repository: FAQRepository, engine: NLPEngine, exact: ExactMatcher):
+        self.kb_id = kb_id
+        self.repository = repository
+        self.engine = engine
+        self.exact = exact
+        self.active = 0  # requests currently using it; never unloaded while > 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    @property
+    def index_lock(self) -> asyncio.Lock:
+        """
+        Serializes changes to the index: loading, syncs, CRUD upserts and bulk imports.
+        """
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the embedding index, memory-mapped vectors included.
+        """
+        if not self.engine.index_ready:
+            return 0
+        index = self.engine.index
+        return index.nbytes or index.vectors.nbytes
+
+    def unload(self) -> None:
+        self.engine.unload_index()
+        self.exact.build([])
+        self.repository.clear()
+
+class KnowledgeBases:
+    """
+    Registry of knowledge bases, selected per request by `kb_id`.
+
+    The default knowledge base is the app's global repository, engine and exact-match
+    table: the startup warm-up builds it and it stays resident. Any other one is created
+    on first use and its index built then (from its own on-disk embedding store when
+    possible, so a reload does not re-encode). While the indexes of the loaded ones
+    exceed `memory_budget` bytes, the least recently used are unloaded, skipping those
+    serving a request. All knowledge bases share the encoder; spell correction uses the
+    default one's vocabulary.
+    """
+
+    def __init__(self, default: KnowledgeBase, memory_budget: int):
+        self.default = default
+        self.memory_budget = memory_budget
+        self.tenants: Dict[str, KnowledgeBase] = {}
+        self.resident: "OrderedDict[str, KnowledgeBase]" = OrderedDict()  # least recently used first
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, kb_id: str) -> KnowledgeBase:
+        if kb_id == self.default.kb_id:
+            return self.default
+        kb = self.tenants.get(kb_id)
+        if kb is None:
+            store_path = f"{settings.EMBEDDING_STORE_PATH}-kb-{kb_id}" if settings.EMBEDDING_STORE_PATH else ""
+            kb = self.tenants[kb_id] = KnowledgeBase(
+                kb_id,
+                FAQRepository(db, refresh_seconds=settings.SNAPSHOT_REFRESH_SECONDS, kb_id=kb_id),
+                NLPEngine(nlp_engine.model_name, shared=nlp_engine, store_path=store_path),
+                ExactMatcher(),
+            )
+        return kb
+
+    async def acquire(self, kb_id: str) -> KnowledgeBase:
+        """
+        The knowledge base, loaded and pinned until `release`.
+        """
+        kb = self.get(kb_id)
+        kb.active += 1
+        try:
+            await self._ensure_loaded(kb)
+        except BaseException:
+            kb.active -= 1
+            raise
+        return kb
+
+    def release(self, kb: KnowledgeBase) -> None:
+        kb.active -= 1
+
+    async def _ensure_loaded(self, kb: KnowledgeBase) -> None:
+        if kb is self.default:
+            return
+        if kb.kb_id in self.resident:
+            self.resident.move_to_end(kb.kb_id)
+            return
+        async with kb.index_lock:
+            if kb.kb_id in self.resident:
+                return
+            snapshot = await kb.repository.snapshot()
+            faqs = snapshot.faqs()
+            await asyncio.get_running_loop().run_in_executor(None, kb.engine.build_index, faqs)
+            kb.exact.build(faqs)
+            kb.engine.corpus_version = snapshot.version
+            self.resident[kb.kb_id] = kb
+            self.loads += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        total = sum(kb.nbytes for kb in self.resident.values())
+        for kb_id in list(self.resident):
+            if total <= self.memory_budget:
+                break
+            kb = self.resident[kb_id]
+            if kb.active:
+                continue
+            total -= kb.nbytes
+            kb.unload()
+            del self.resident[kb_id]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "resident": len(self.resident),
+            "known": len(self.tenants),
+            "resident_bytes": sum(kb.nbytes for kb in self.resident.values()),
+            "memory_budget_bytes": self.memory_budget,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+# Global instance
+knowledge_bases = KnowledgeBases(
+    KnowledgeBase(DEFAULT_KB_ID, repository, nlp_engine, exact_matcher),
+    memory_budget=int(settings.KB_MEMORY_BUDGET_MB * 1024 * 1024),
+)
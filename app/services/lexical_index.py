@@ -0,0 +1,143 @@
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.text_utils import normalize_query
+from app.services.vector_index import top_k
+
+# Words that appear in most FAQ questions and say nothing about which one is meant
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from have how i if in is it me my of on or our "
+    "should so that the there this to was we what when where which who why will with would you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in normalize_query(text).split() if token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Inverted index over FAQ text with Okapi BM25 scoring, keyed by FAQ id.
+
+    A search only touches the postings of the query's terms, so its cost depends on how
+    many FAQs share a word with the query rather than on the corpus size. Documents can
+    be added, replaced and removed one at a time: each has a numbered slot (reused after
+    removal), postings map slots to term frequencies, and a term's postings are turned
+    into numpy arrays when first searched and dropped again when they change.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}  # term -> {slot: term frequency}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # term -> (slots, frequencies)
+        self.slots: Dict[str, int] = {}
+        self.slot_ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.slots
+
+    def add(self, id: str, text: str) -> None:
+        """
+        Indexes `text` under `id`, replacing what was indexed for it before.
+        """
+        self.remove(id)
+        if self._free:
+            slot = self._free.pop()
+            self.slot_ids[slot] = id
+        else:
+            slot = len(self.slot_ids)
+            self.slot_ids.append(id)
+            if slot >= len(self.doc_len):
+                grown = np.zeros(max(16, 2 * len(self.doc_len)), dtype=np.float32)
+                grown[:len(self.doc_len)] = self.doc_len
+                self.doc_len = grown
+        terms = Counter(tokenize(text))
+        self.slots[id] = slot
+        self.doc_terms[id] = terms
+        self.doc_len[slot] = sum(terms.values())
+        self.total_len += int(self.doc_len[slot])
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[slot] = tf
+            self._arrays.pop(term, None)
+
+    def remove(self, id: str) -> bool:
+        slot = self.slots.pop(id, None)
+        if slot is None:
+            return False
+        self.total_len -= int(self.doc_len[slot])
+        self.doc_len[slot] = 0
+        self.slot_ids[slot] = None
+        self._free.append(slot)
+        for term in self.doc_terms.pop(id):
+            postings = self.postings[term]
+            del postings[slot]
+            self._arrays.pop(term, None)
+            if not postings:
+                del self.postings[term]
+        return True
+
+    def clear(self) -> None:
+        self.__init__(self.k1, self.b)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (len(self.slots) - df + 0.5) / (df + 0.5))
+
+    def _term_weights(self, text: str) -> Dict[str, float]:
+        return {term: self.idf(term) for term in set(tokenize(text)) if term in self.postings}
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings[term]
+            arrays = self._arrays[term] = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                                           np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+        return arrays
+
+    def search(self, text: str, n: int) -> Tuple[List[str], np.ndarray]:
+        """
+        The `n` best-scoring FAQ ids for `text`, best first. FAQs sharing no term with it are never returned.
+        """
+        weights = self._term_weights(text)
+        if not weights:
+            return [], np.zeros(0, dtype=np.float32)
+        k1, b = self.k1, self.b
+        avg_len = self.total_len / len(self.slots)
+        touched, contributions = [], []
+        for term, idf in weights.items():
+            slots, tf = self._term_arrays(term)
+            norm = k1 * (1.0 - b + b * self.doc_len[slots] / avg_len)
+            touched.append(slots)
+            contributions.append(idf * tf * (k1 + 1.0) / (tf + norm))
+        # Sum per slot over the touched postings only, never over an array the size of the corpus
+        slots, inverse = np.unique(np.concatenate(touched), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype(np.float32)
+        matched = np.flatnonzero(scores)
+        order = matched[top_k(scores[matched], n)]
+        return [self.slot_ids[slot] for slot in slots[order]], scores[order]
+
+    def score_ids(self, text: str, ids: Sequence[str]) -> np.ndarray:
+        """
+        BM25 scores of `text` against the given FAQ ids (0 for unknown ids).
+        """
+        weights = self._term_weights(text)
+        scores = np.zeros(len(ids), dtype=np.float32)
+        if not weights:
+            return scores
+        k1, b = self.k1, self.b
+        avg_len = self.total_len / len(self.slots)
+        for i, id in enumerate(ids):
+            terms = self.doc_terms.get(id)
+            if not terms:
+                continue
+            norm = k1 * (1.0 - b + b * float(self.doc_len[self.slots[id]]) / avg_len)
+            scores[i] = sum(idf * terms[term] * (k1 + 1.0) / (terms[term] + norm)
+                            for term, idf in weights.items() if term in terms)
+        return scores
@@ -0,0 +1,146 @@
+import asyncio
+import traceback
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.metrics import CONFIDENCE_BUCKETS
+from app.services.text_utils import normalize_query
+
+OUTCOMES = ("hit", "fallback", "no_answer")
+
+def log_time(log: dict) -> datetime:
+    # Stored logs carry datetimes (Mongo, fresh writes) or their str() form (JSON file)
+    timestamp = log["timestamp"]
+    return timestamp if isinstance(timestamp, datetime) else datetime.fromisoformat(timestamp)
+
+def hour_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H")
+
+def confidence_bucket(score: float) -> int:
+    for i, bound in enumerate(CONFIDENCE_BUCKETS):
+        if score <= bound:
+            return i
+    return len(CONFIDENCE_BUCKETS)
+
+def log_increments(logs: Iterable[dict]) -> Tuple[Dict[str, Counter], Counter, Counter]:
+    """
+    What a batch of logs adds to the rollups: per-hour counters, counters for all time
+    (volume, outcomes and confidence buckets as "confidence_<i>") and unanswered query counts.
+    """
+    hours: Dict[str, Counter] = {}
+    totals, unanswered = Counter(), Counter()
+    for log in logs:
+        fields = ["total"]
+        outcome = log.get("outcome")
+        if outcome in OUTCOMES:
+            fields.append(outcome)
+        if outcome in ("fallback", "no_answer"):
+            unanswered[normalize_query(log["query"])] += 1
+        hours.setdefault(hour_key(log_time(log)), Counter()).update(fields)
+        totals.update(fields)
+        totals[f"confidence_{confidence_bucket(log['score'])}"] += 1
+    return hours, totals, unanswered
+
+def summarize(hours: Dict[str, dict], totals: dict, unanswered: List[Tuple[str, int]], now: datetime, n_hours: int) -> dict:
+    """
+    Admin view of the rollups: the last `n_hours` hours (oldest first, empty hours included),
+    all-time totals, the confidence histogram and the top unanswered queries.
+    """
+    keys = [hour_key(now - timedelta(hours=i)) for i in reversed(range(n_hours))]
+    return {
+        "hours": [{"hour": key, **{field: hours.get(key, {}).get(field, 0) for field in ("total",) + OUTCOMES}}
+                  for key in keys],
+        "totals": {field: totals.get(field, 0) for field in ("total",) + OUTCOMES},
+        "confidence_histogram": [
+            {"le": bound, "count": totals.get(f"confidence_{i}", 0)}
+            for i, bound in enumerate(CONFIDENCE_BUCKETS + ("+Inf",))
+        ],
+        "top_unanswered": [{"query": query, "count": count} for query, count in unanswered],
+    }
+
+class LogRollups:
+    """
+    Running aggregates of the query log, updated as each log is written, so analytics
+    never scan raw logs: per-hour volume and outcome counts, all-time totals with a
+    confidence histogram, and counts of unanswered (fallback / no-answer) normalized
+    queries. Logs written before outcomes were recorded only count towards volume and
+    confidence.
+
+    The unanswered counter keeps at most `max_unanswered` queries; past that, the less
+    frequent half is dropped.
+    """
+
+    def __init__(self, max_unanswered: int = 10000):
+        self.max_unanswered = max_unanswered
+        self.hours: Dict[str, Counter] = {}
+        self.totals: Counter = Counter()
+        self.unanswered: Counter = Counter()
+
+    def observe(self, logs: Iterable[dict]) -> None:
+        hours, totals, unanswered = log_increments(logs)
+        for key, counts in hours.items():
+            self.hours.setdefault(key, Counter()).update(counts)
+        self.totals.update(totals)
+        self.unanswered.update(unanswered)
+        if len(self.unanswered) > self.max_unanswered:
+            self.unanswered = Counter(dict(self.unanswered.most_common(self.max_unanswered // 2)))
+
+    def summary(self, now: datetime, hours: int = 24, top: int = 10) -> dict:
+        return summarize(self.hours, self.totals, self.unanswered.most_common(top), now, hours)
+
+    def to_dict(self) -> dict:
+        return {"hours": self.hours, "totals": self.totals, "unanswered": self.unanswered}
+
+    @classmethod
+    def from_dict(cls, data: dict, max_unanswered: int = 10000) -> "LogRollups":
+        rollups = cls(max_unanswered)
+        rollups.hours = {key: Counter(counts) for key, counts in data.get("hours", {}).items()}
+        rollups.totals = Counter(data.get("totals", {}))
+        rollups.unanswered = Counter(data.get("unanswered", {}))
+        return rollups
+
+class LogRetention:
+    """
+    Background task that deletes raw query logs older than `days` every `interval`
+    seconds. Their counts stay in the rollups, which are updated when logs are written.
+    """
+
+    def __init__(self, days: float, interval: float = 3600.0):
+        self.days = days
+        self.interval = interval
+        self.db = None
+        self.purged = 0
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self, db) -> None:
+        if self.days <= 0:
+            return
+        self.db = db
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self.purge()
+            await asyncio.sleep(self.interval)
+
+    async def purge(self) -> int:
+        try:
+            purged = await self.db.purge_logs(datetime.utcnow() - timedelta(days=self.days))
+        except Exception:
+            traceback.print_exc()
+            return 0
+        self.purged += purged
+        return purged
+
+    async def stop(self) -> None:
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+# Global instance
+log_retention = LogRetention(settings.LOG_RETENTION_DAYS, settings.LOG_RETENTION_CHECK_SECONDS)
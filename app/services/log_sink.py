@@ -0,0 +1,125 @@
+import asyncio
+import traceback
+from typing import List, Optional
+from app.core.config import settings
+from app.models.faq import QueryLog
+
+class QueryLogSink:
+    """
+    Background writer for query logs, so /api/chat never waits on the database.
+
+    `submit()` only enqueues. A worker task writes the queue in batches with
+    `db.log_queries()` whenever `batch_size` entries are waiting or every
+    `flush_interval` seconds, and drains it on shutdown (a write in progress is let
+    finish, never cancelled). When the queue is full,
+    new entries are dropped and counted instead of blocking the request.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.db = None
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Stats
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self, db) -> None:
+        self.db = db
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._full = asyncio.Event()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        """
+        True when the worker is alive on the current event loop and not stopping.
+        """
+        if self._worker is None or self._worker.done() or self._stopping:
+            return False
+        try:
+            return self._worker.get_loop() is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    def submit(self, log: QueryLog) -> bool:
+        """
+        Queues a log entry without waiting. Returns False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait(log)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._full.set()
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+        # Whatever was submitted while the last batch was being written
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Writes everything currently queued, `batch_size` entries per database call.
+        """
+        while self._queue is not None and not self._queue.empty():
+            batch: List[QueryLog] = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self.db.log_queries(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception:
+                self.failed += len(batch)
+                traceback.print_exc()
+
+    async def stop(self) -> None:
+        """
+        Stops the worker once its current write is done and drains whatever is still queued.
+        Batches are taken off the queue before they are written, so cancelling the worker
+        mid-write would lose one (or, on Mongo, write the logs but not their rollups).
+        """
+        if self._worker and not self._worker.done():
+            self._stopping = True
+            self._full.set()  # wake the worker now instead of after flush_interval
+            await self._worker
+        elif self._queue is not None and self.db is not None:
+            await self.flush()
+        self._worker = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+# Global instance
+log_sink = QueryLogSink(
+    max_queue=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL_SECONDS,
+)
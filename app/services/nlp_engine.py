@@ -1,52 +1,368 @@
-from sentence_transformers import SentenceTransformer, util
-from typing import List, Tuple, Optional
-import torch
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Optional
+import threading
+import numpy as np
+from app.core.config import settings
+from app.services.embedding_store import EmbeddingStore, content_hash
+from app.services.encoders import TorchEncoder, create_encoder
+from app.services.inference_pool import InferencePool
+from app.services.lexical_index import BM25Index
+from app.services.vector_index import ExactIndex, create_index
+
+class Ranking(NamedTuple):
+    """
+    Result of a single ranking pass: the top-k FAQ ids with their scores, best first.
+    """
+    ids: List[str]
+    scores: np.ndarray
+    threshold: float
+
+    @property
+    def best(self) -> Optional[Tuple[str, float]]:
+        """
+        (faq_id, score) of the top hit if it clears the threshold, else None.
+        """
+        if self.ids and self.scores[0] >= self.threshold:
+            return self.ids[0], float(self.scores[0])
+        return None
+
+    def suggestions(self, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Top-k (faq_id, score) pairs above `min_score`, for fallback suggestions.
+        """
+        keep = int(np.count_nonzero(self.scores > min_score))
+        return [(faq_id, float(score)) for faq_id, score in zip(self.ids[:keep], self.scores[:keep])]
 
 class NLPEngine:
-    def __init__(self, model_name: str = "sentence-transformers/paraphrase-MiniLM-L6-v2"):
-        print(f"Loading NLP model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
-        print("NLP model loaded.")
+    def __init__(self, model_name: str = "sentence-transformers/paraphrase-MiniLM-L6-v2",
+                 shared: Optional["NLPEngine"] = None, store_path: Optional[str] = None):
+        # Nothing heavy happens here: the model is loaded by load(), either during the
+        # startup warm-up or on first use, so importing the app stays fast.
+        self.model_name = model_name
+        # Engine whose encoder this one reuses: knowledge bases other than the default only own an index
+        self.shared = shared
+        self.store_path = settings.EMBEDDING_STORE_PATH if store_path is None else store_path
+        self.dim = 0
+        self._encoder: Optional[TorchEncoder] = None
+        self._load_lock = threading.Lock()
+
+        # In-memory FAQ embedding index keyed by FAQ id, plus the text each entry was embedded from
+        self._index: Optional[ExactIndex] = None
+        self.faq_texts: Dict[str, str] = {}
+        self.store: Optional[EmbeddingStore] = None
+        self.index_ready = False
+        # Version of the FAQ snapshot the index reflects (see app/core/repository.py)
+        self.corpus_version: Optional[int] = None
+        # BM25 index over the same FAQs, kept only in hybrid retrieval mode
+        self.lexical: Optional[BM25Index] = None
+        # Hybrid rankings answered from the lexical shortlist vs. those that fell back to the full scan
+        self.hybrid_stats = {"shortlist": 0, "full_scan": 0}
+
+    def load(self) -> None:
+        """
+        Loads the model through the configured encoder backend (ENCODER_BACKEND) and creates
+        the (empty) FAQ index. Safe to call repeatedly and from several threads.
+        """
+        if self._encoder is not None:
+            return
+        with self._load_lock:
+            if self._encoder is not None:
+                return
+            if self.shared is not None:
+                encoder = self.shared.encoder
+                self.dim = encoder.dim
+                self._create_index(encoder)
+                self._encoder = encoder
+                return
+            if settings.INFERENCE_PROCESSES > 0:
+                # The model lives in worker processes; this process only sends them texts
+                encoder = InferencePool(settings.ENCODER_BACKEND, self.model_name, settings.INFERENCE_PROCESSES,
+                                        threads=settings.ENCODER_THREADS or 1)
+            else:
+                encoder = create_encoder(settings.ENCODER_BACKEND, self.model_name, threads=settings.ENCODER_THREADS)
+            print(f"Loading NLP model: {self.model_name} ({encoder.name} backend)...")
+            encoder.load()
+            self.dim = encoder.dim
+            self._create_index(encoder)
+            self._encoder = encoder
+            print("NLP model loaded.")
+
+    def _create_index(self, encoder) -> None:
+        self._index = create_index(settings.VECTOR_INDEX, self.dim, **self.index_options())
+        self.lexical = BM25Index() if settings.RETRIEVAL_MODE == "hybrid" else None
+        if self.store_path:
+            # Keyed by backend too: quantized and float embeddings must not be mixed
+            self.store = EmbeddingStore(self.store_path, encoder.cache_key, self.dim)
+
+    def unload_index(self) -> None:
+        """
+        Frees the FAQ index (the encoder stays loaded). The next build_index rebuilds it,
+        reusing the on-disk embedding store.
+        """
+        with self._load_lock:
+            if self._encoder is not None:
+                self._create_index(self._encoder)
+            self.faq_texts = {}
+            self.index_ready = False
+            self.corpus_version = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._encoder is not None
+
+    def close(self) -> None:
+        """
+        Stops inference worker processes, if any. Called on shutdown.
+        """
+        if self.shared is None and isinstance(self._encoder, InferencePool):
+            self._encoder.shutdown()
+            self._encoder = None
+
+    @property
+    def encoder(self) -> TorchEncoder:
+        self.load()
+        return self._encoder
+
+    @property
+    def model(self):
+        return self.encoder.model
+
+    @property
+    def index(self) -> ExactIndex:
+        self.load()
+        return self._index
+
+    @staticmethod
+    def index_options() -> dict:
+        if settings.VECTOR_INDEX == "ivf":
+            return {
+                "n_lists": settings.IVF_N_LISTS,
+                "n_probe": settings.IVF_N_PROBE,
+                "min_train_size": settings.IVF_MIN_TRAIN_SIZE,
+            }
+        return {"precision": settings.EMBEDDING_PRECISION, "rerank": settings.EMBEDDING_RERANK}
+
+    @staticmethod
+    def faq_text(faq) -> str:
+        """
+        Text that gets embedded for a FAQ (Question + Answer for better context).
+        """
+        return f"{faq.question} {faq.answer}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes texts into L2-normalized float32 embeddings, so a dot product is the cosine similarity.
+        """
+        return self.encoder.encode(texts)
+
+    def encode_bucketed(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """
+        Encodes a large list in batches of similar length, so short texts are not padded
+        to the length of the longest one in their batch. Output keeps the input order.
+        """
+        self.load()
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            embeddings[bucket] = self.encode([texts[i] for i in bucket])
+        return embeddings
+
+    # --- FAQ index maintenance ---
+
+    def build_index(self, faqs: Iterable) -> None:
+        """
+        (Re)builds the whole FAQ index. Called once at startup.
+        Embeddings found in the on-disk store (same question + answer) are reused;
+        only new or changed FAQs are encoded, and the store is rewritten if anything changed.
+        """
+        self.load()
+        faqs = list(faqs)
+        ids = [faq.id for faq in faqs]
+        texts = [self.faq_text(faq) for faq in faqs]
+        self.faq_texts = dict(zip(ids, texts))
+        if self.lexical is not None:
+            self.lexical.clear()
+            for id, text in self.faq_texts.items():
+                self.lexical.add(id, text)
+
+        if self.store is None:
+            self.index.clear()
+            self.index.add(ids, self.encode(texts))
+            print(f"FAQ index ({self.index.kind}) built with {len(self.index)} entries.")
+            self.index_ready = True
+            return
+
+        self.store.load()
+        hashes = [content_hash(faq.question, faq.answer) for faq in faqs]
+        rows = self.store.lookup(hashes)
+        missing = [i for i, row in enumerate(rows) if row is None]
+
+        if self.store.keys != hashes or self.store.vectors is None:
+            vectors = np.empty((len(faqs), self.dim), dtype=np.float32)
+            cached = [i for i, row in enumerate(rows) if row is not None]
+            if cached:
+                vectors[cached] = self.store.vectors[[rows[i] for i in cached]]
+            if missing:
+                vectors[missing] = self.encode([texts[i] for i in missing])
+            self.store.save(hashes, vectors)
+
+        if self.store.keys == hashes and self.store.vectors is not None:
+            # The store now holds exactly this corpus in order: serve straight from the memory map
+            self.index.attach(ids, self.store.vectors)
+        else:
+            # Another worker replaced or cleaned up this generation before it was mapped
+            print(f"Embedding store {self.store.path} changed while saving, serving this build from memory.")
+            self.index.attach(ids, vectors)
+        print(f"FAQ index ({self.index.kind}) built with {len(self.index)} entries "
+              f"({len(faqs) - len(missing)} reused from {self.store.path}, {len(missing)} encoded).")
+        self.index_ready = True
+
+    def sync_index(self, faqs: Iterable) -> None:
+        """
+        Brings the index in line with `faqs`, encoding only new or changed entries.
+        Covers writes that did not go through the API (e.g. the seed scripts).
+        """
+        stale, changed = self.sync_changes(faqs)
+        for faq_id in stale:
+            self.remove_faq(faq_id)
+        if changed:
+            self.upsert_faqs(changed)
+
+    def sync_changes(self, faqs: Iterable) -> Tuple[List[str], List]:
+        """
+        What `sync_index` would do: the ids to remove and the FAQs to (re-)encode.
+        Lets callers encode elsewhere and change the index themselves.
+        """
+        faqs = list(faqs)
+        live_ids = {faq.id for faq in faqs}
+        stale = [faq_id for faq_id in self.index.ids if faq_id not in live_ids]
+        changed = [faq for faq in faqs if self.faq_texts.get(faq.id) != self.faq_text(faq)]
+        return stale, changed
+
+    def upsert_faq(self, faq) -> None:
+        self.upsert_faqs([faq])
+
+    def upsert_faqs(self, faqs: List) -> None:
+        """
+        Adds new FAQs to the index or re-embeds existing ones whose text changed.
+        """
+        self.index_embeddings(faqs, self.encode([self.faq_text(faq) for faq in faqs]))
+
+    def index_embeddings(self, faqs: List, embeddings: np.ndarray) -> None:
+        """
+        Adds FAQs whose embeddings were computed elsewhere (e.g. by the bulk import).
+        """
+        self.index.add([faq.id for faq in faqs], embeddings)
+        for faq in faqs:
+            self.faq_texts[faq.id] = self.faq_text(faq)
+            if self.lexical is not None:
+                self.lexical.add(faq.id, self.faq_texts[faq.id])
+
+    def remove_faq(self, faq_id: str) -> bool:
+        self.faq_texts.pop(faq_id, None)
+        if self.lexical is not None:
+            self.lexical.remove(faq_id)
+        return self.index.remove(faq_id)
+
+    @property
+    def index_size(self) -> int:
+        return len(self.index)
+
+    # --- Matching ---
 
     def compute_similarity(self, query: str, corpus: List[str]) -> List[Tuple[int, float]]:
         """
-        Computes similarity scores between a query and a list of corpus strings.
+        Computes similarity scores between a query and an ad-hoc list of corpus strings.
         Returns a list of (index, score) tuples, sorted by score descending.
+        Used by the debug scripts; chat requests go through the FAQ index instead.
+        Goes through `encode`, so it works with every encoder backend and the inference pool.
         """
         if not corpus:
             return []
 
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-        corpus_embeddings = self.model.encode(corpus, convert_to_tensor=True)
+        embeddings = self.encode([query] + list(corpus))
+        # Normalized embeddings: the dot product is the cosine similarity
+        cos_scores = embeddings[1:] @ embeddings[0]
 
-        # Compute cosine similarity
-        cos_scores = util.cos_sim(query_embedding, corpus_embeddings)[0]
-
-        # Get sorted results
-        # We prefer to return top k results or just all sorted
-        results = []
-        for i in range(len(corpus)):
-            results.append((i, float(cos_scores[i])))
-        
+        results = [(i, float(cos_scores[i])) for i in range(len(corpus))]
         results.sort(key=lambda x: x[1], reverse=True)
         return results
 
-    def find_best_match(self, query: str, questions: List[str], threshold: float = 0.5) -> Optional[Tuple[int, float]]:
+    def rank(self, query: str, k: int = 3, threshold: float = 0.5) -> Ranking:
         """
-        Finds the single best match for a query among questions.
-        Returns (index, score) if score > threshold, else None.
+        Scores the query once and returns the best hit and the top-k suggestions together.
         """
-        results = self.compute_similarity(query, questions)
-        if results and results[0][1] >= threshold:
-            return results[0]
-        return None
+        return self.rank_embedding(self.encode([query])[0], k=k, threshold=threshold, text=query)
+
+    def rank_embedding(self, query_embedding: np.ndarray, k: int = 3, threshold: float = 0.5,
+                       text: Optional[str] = None) -> Ranking:
+        """
+        Same as `rank`, for a query that was already encoded (e.g. by the batch encoder).
+        In hybrid mode `text` (the query as matched lexically) selects the shortlist.
+        """
+        if self.lexical is None or text is None:
+            ids, scores = self.index.search(query_embedding, k)
+            return Ranking(ids=ids, scores=scores, threshold=threshold)
+        return self._rank_hybrid(query_embedding, text, k, threshold)
+
+    def rank_embeddings(self, query_embeddings: np.ndarray, k: int = 3, threshold: float = 0.5,
+                        texts: Optional[List[str]] = None) -> List[Ranking]:
+        """
+        `rank_embedding` for a batch of encoded queries, scored with one matrix multiply
+        (in hybrid mode each query is ranked against its own shortlist instead).
+        """
+        if self.lexical is not None and texts is not None:
+            return [self._rank_hybrid(embedding, text, k, threshold) for embedding, text in zip(query_embeddings, texts)]
+        return [Ranking(ids=ids, scores=scores, threshold=threshold)
+                for ids, scores in self.index.search_batch(query_embeddings, k)]
+
+    def _rank_hybrid(self, query_embedding: np.ndarray, text: str, k: int, threshold: float) -> Ranking:
+        """
+        Scores only the FAQs sharing terms with the query (its BM25 top HYBRID_SHORTLIST_SIZE).
+        If no shortlisted FAQ clears the threshold, the answer may be a paraphrase without
+        common words, so the whole index is scanned as in semantic mode.
+        """
+        shortlist, lexical = self.lexical.search(text, settings.HYBRID_SHORTLIST_SIZE)
+        lexical_max = float(lexical[0]) if len(lexical) else 0.0
+        keep = [i for i, id in enumerate(shortlist) if id in self.index]
+        if len(keep) >= settings.HYBRID_MIN_CANDIDATES:
+            ids = [shortlist[i] for i in keep]
+            ids, scores = self._fuse(ids, self.index.score_ids(ids, query_embedding), lexical[keep], lexical_max)
+            if scores[0] >= threshold:
+                self.hybrid_stats["shortlist"] += 1
+                return Ranking(ids=ids[:k], scores=scores[:k], threshold=threshold)
+
+        self.hybrid_stats["full_scan"] += 1
+        ids, scores = self.index.search(query_embedding, k)
+        if settings.HYBRID_LEXICAL_WEIGHT and ids:
+            ids, scores = self._fuse(ids, scores, self.lexical.score_ids(text, ids), lexical_max)
+        return Ranking(ids=ids, scores=scores, threshold=threshold)
+
+    def _fuse(self, ids: List[str], semantic: np.ndarray, lexical: np.ndarray,
+              lexical_max: float) -> Tuple[List[str], np.ndarray]:
+        """
+        Orders candidates by (1 - w) * cosine + w * BM25 / best BM25 of the query, w = HYBRID_LEXICAL_WEIGHT.
+        """
+        weight = settings.HYBRID_LEXICAL_WEIGHT
+        scores = semantic
+        if weight and lexical_max > 0:
+            scores = (1.0 - weight) * semantic + weight * (lexical / lexical_max)
+        order = np.argsort(-scores, kind="stable")
+        return [ids[i] for i in order], scores[order]
+
+    def find_best_match(self, query: str, threshold: float = 0.5) -> Optional[Tuple[str, float]]:
+        """
+        Finds the single best indexed FAQ for a query.
+        Returns (faq_id, score) if score >= threshold, else None.
+        """
+        return self.rank(query, k=1, threshold=threshold).best
 
-    def find_closest_matches(self, query: str, questions: List[str], k: int = 3) -> List[Tuple[int, float]]:
+    def find_closest_matches(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
         """
-        Returns top k matches regardless of threshold, for fallback suggestions.
+        Returns top k indexed FAQs as (faq_id, score) regardless of threshold, for fallback suggestions.
         """
-        results = self.compute_similarity(query, questions)
-        return results[:k]
+        ranking = self.rank(query, k=k)
+        return [(faq_id, float(score)) for faq_id, score in zip(ranking.ids, ranking.scores)]
 
 # Global instance
 nlp_engine = NLPEngine()
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from app.core.config import settings
+from app.models.faq import DEFAULT_KB_ID
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry when full.
+    Entries older than `ttl_seconds` (0 = never) are treated as misses.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, stored_at = entry
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def discard_if(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+class QueryCache:
+    """
+    Two-tier cache for /api/chat, keyed on the normalized query:
+      - embeddings: corrected query -> query embedding (independent of the FAQ corpus)
+      - responses:  (knowledge base, corpus version, vocabulary version, query) -> final ChatResponse
+                    and its outcome (hit, fallback, ...)
+
+    The corpus version is the knowledge base's FAQ snapshot version, which every FAQ change
+    bumps, so a change makes every cached response of that knowledge base unreachable at
+    once; the other knowledge bases keep theirs. The vocabulary version is the spell
+    corrector's: every knowledge base corrects queries with the default one's vocabulary,
+    so when it changes all cached responses go.
+    """
+
+    def __init__(self, response_size: int, embedding_size: int, ttl_seconds: float):
+        self.versions: Dict[str, int] = {}  # knowledge base -> latest corpus version seen
+        self.vocabulary = 0  # latest vocabulary version seen
+        self.embeddings = LRUCache(embedding_size, ttl_seconds)
+        self.responses = LRUCache(response_size, ttl_seconds)
+
+    def _see_version(self, kb_id: str, version: int, vocabulary: int) -> None:
+        # Old-version entries can never hit again; drop them instead of waiting for eviction
+        if vocabulary > self.vocabulary:
+            self.vocabulary = vocabulary
+            self.responses.discard_if(lambda key: key[2] != vocabulary)
+        if version > self.versions.get(kb_id, 0):
+            self.versions[kb_id] = version
+            self.responses.discard_if(lambda key: key[0] == kb_id and key[1] != version)
+
+    def get_response(self, key: str, version: int, kb_id: str = DEFAULT_KB_ID, vocabulary: int = 0):
+        self._see_version(kb_id, version, vocabulary)
+        return self.responses.get((kb_id, version, vocabulary, key))
+
+    def put_response(self, key: str, version: int, response, kb_id: str = DEFAULT_KB_ID, vocabulary: int = 0) -> None:
+        self._see_version(kb_id, version, vocabulary)
+        self.responses.set((kb_id, version, vocabulary, key), response)
+
+    def stats(self) -> dict:
+        return {
+            "corpus_versions": dict(self.versions),
+            "vocabulary_version": self.vocabulary,
+            "responses": self.responses.stats(),
+            "embeddings": self.embeddings.stats(),
+        }
+
+# Global instance
+query_cache = QueryCache(
+    response_size=settings.QUERY_CACHE_SIZE,
+    embedding_size=settings.EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+)
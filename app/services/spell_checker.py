@@ -1,19 +1,225 @@
-from spellchecker import SpellChecker
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+from app.core.config import settings
+
+_TOKEN = re.compile(r"^(\W*)(.*?)(\W*)$")
+_WORD = re.compile(r"[a-z]+")
+
+# Campus words the general English dictionary does not know
+CUSTOM_WORDS = ['wifi', 'login', 'portal', 'chatbot', 'faq', 'admin']
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Damerau-Levenshtein (optimal string alignment) distance between a and b.
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
 
 class SpellCorrector:
-    def __init__(self):
-        self.spell = SpellChecker()
-        # Add custom words if needed
-        self.spell.word_frequency.load_words(['wifi', 'login', 'portal', 'chatbot', 'faq', 'admin'])
+    """
+    Symmetric-delete (SymSpell-style) spell corrector.
+
+    Every vocabulary word is indexed under all strings obtained by deleting up to
+    `max_edit_distance` characters from its first `prefix_length` characters. A misspelled
+    token is looked up by generating its own deletes, so finding candidates is a handful of
+    dict lookups instead of generating every possible edit. The vocabulary is the most
+    frequent words of pyspellchecker's English dictionary plus every word in the FAQ
+    corpus; FAQ words win ties, so campus terms are never "corrected" away. Words in the
+    full dictionary are left alone even if they are too rare to be correction targets.
+    """
+
+    def __init__(self, max_edit_distance: int = 2, prefix_length: int = 7, base_vocab_size: int = 20000):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.base_vocab_size = base_vocab_size
+
+        self.base_words: Dict[str, int] = {}
+        self.known_words: Dict[str, int] = {}
+        self.faq_words: Counter = Counter()  # word -> number of FAQs using it
+        self.faq_vocab: Dict[str, Set[str]] = {}  # faq id -> its words
+        self.deletes: Dict[str, List[str]] = {}
+        self.memo: Dict[str, str] = {}
+        # Bumped whenever the FAQ vocabulary changes, i.e. whenever a correction may come out differently
+        self.vocabulary_version = 0
+
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._faq_frequency = 1
+
+    def load(self) -> None:
+        """
+        Indexes the base dictionary. The dictionary is loaded by the startup warm-up or on first use.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            from spellchecker import SpellChecker
+            frequencies = SpellChecker().word_frequency.dictionary
+            self.known_words = frequencies
+            common = sorted(
+                (word for word in frequencies if word.isalpha()),
+                key=lambda word: frequencies[word], reverse=True,
+            )[:self.base_vocab_size]
+            self.base_words = {word: frequencies[word] for word in common}
+            # FAQ words rank above any dictionary word at the same edit distance
+            self._faq_frequency = max(self.base_words.values(), default=0) + 1
+            for word in CUSTOM_WORDS:
+                self.base_words[word] = self._faq_frequency
+            for word in self.base_words:
+                self._index_word(word)
+            self._loaded = True
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    # --- Vocabulary ---
+
+    def _word_deletes(self, word: str) -> Set[str]:
+        prefix = word[:self.prefix_length]
+        result = {prefix}
+        frontier = {prefix}
+        for _ in range(self.max_edit_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            result |= frontier
+        return result
+
+    def _index_word(self, word: str) -> None:
+        for delete in self._word_deletes(word):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def _unindex_word(self, word: str) -> None:
+        for delete in self._word_deletes(word):
+            words = self.deletes.get(delete)
+            if words and word in words:
+                words.remove(word)
+                if not words:
+                    del self.deletes[delete]
+
+    def frequency(self, word: str) -> int:
+        # FAQ words outrank dictionary words, and among themselves the most widely used wins
+        if word in self.faq_words:
+            return self._faq_frequency + self.faq_words[word]
+        return self.base_words.get(word, 0)
+
+    def is_known(self, word: str) -> bool:
+        return word in self.faq_words or word in self.base_words or word in self.known_words
+
+    @staticmethod
+    def faq_words_of(faq) -> Set[str]:
+        return {word for word in _WORD.findall(f"{faq.question} {faq.answer}".lower()) if len(word) > 2}
+
+    def build_vocabulary(self, faqs: Iterable) -> None:
+        """
+        Replaces the FAQ part of the vocabulary. Called at startup.
+        """
+        self.load()
+        for faq_id in list(self.faq_vocab):
+            self.remove_faq(faq_id)
+        for faq in faqs:
+            self.update_faq(faq)
+
+    def update_faq(self, faq) -> None:
+        """
+        Adds a created or edited FAQ's words to the vocabulary.
+        """
+        self.load()
+        new_words = self.faq_words_of(faq)
+        old_words = self.faq_vocab.get(faq.id, set())
+        for word in new_words - old_words:
+            if self.faq_words[word] == 0 and word not in self.base_words:
+                self._index_word(word)
+            self.faq_words[word] += 1
+        self._drop_faq_words(old_words - new_words)
+        self.faq_vocab[faq.id] = new_words
+        if new_words != old_words:
+            self._vocabulary_changed()
+
+    def remove_faq(self, faq_id: str) -> None:
+        words = self.faq_vocab.pop(faq_id, None)
+        if words:
+            self._drop_faq_words(words)
+            self._vocabulary_changed()
+
+    def _vocabulary_changed(self) -> None:
+        self.memo.clear()
+        self.vocabulary_version += 1
+
+    def _drop_faq_words(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.faq_words[word] -= 1
+            if self.faq_words[word] <= 0:
+                del self.faq_words[word]
+                if word not in self.base_words:
+                    self._unindex_word(word)
+
+    # --- Correction ---
+
+    def correct_word(self, word: str) -> str:
+        """
+        Best correction for a lowercase word, or the word itself if it is known or nothing is close.
+        Results are memoized until the vocabulary changes.
+        """
+        cached = self.memo.get(word)
+        if cached is not None:
+            return cached
+
+        result = word
+        if word.isalpha() and len(word) > 2 and not self.is_known(word):
+            # Short words get a single edit, otherwise almost anything is "close"
+            max_distance = 1 if len(word) <= 4 else self.max_edit_distance
+            best: Optional[tuple] = None
+            seen: Set[str] = set()
+            for delete in self._word_deletes(word):
+                for candidate in self.deletes.get(delete, ()):
+                    # Never turn a real word into a one- or two-letter one
+                    if candidate in seen or len(candidate) < 3 or abs(len(candidate) - len(word)) > max_distance:
+                        continue
+                    seen.add(candidate)
+                    distance = edit_distance(word, candidate, max_distance)
+                    if distance <= max_distance:
+                        key = (distance, -self.frequency(candidate), candidate)
+                        if best is None or key < best:
+                            best = key
+                            # Only candidates at least as close can still win
+                            max_distance = distance
+            if best is not None:
+                result = best[2]
+
+        if len(self.memo) >= settings.SPELL_MEMO_SIZE:
+            self.memo.clear()
+        self.memo[word] = result
+        return result
 
     def correct_text(self, text: str) -> str:
-        words = text.split()
+        self.load()
         corrected_words = []
-        for word in words:
-            # Get the one `most likely` answer
-            corrected = self.spell.correction(word)
-            # If correction is None (word is correct or unknown), use original
-            corrected_words.append(corrected if corrected else word)
+        for token in text.split():
+            # Keep surrounding punctuation ("wfi?" -> "wifi?") and leave known words untouched
+            leading, core, trailing = _TOKEN.match(token).groups()
+            corrected = self.correct_word(core.lower()) if core else core
+            corrected_words.append(token if corrected == core.lower() else f"{leading}{corrected}{trailing}")
         return " ".join(corrected_words)
 
-spell_corrector = SpellCorrector()
+spell_corrector = SpellCorrector(
+    max_edit_distance=settings.SPELL_MAX_EDIT_DISTANCE,
+    base_vocab_size=settings.SPELL_BASE_VOCAB_SIZE,
+)
@@ -0,0 +1,10 @@
+import re
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """
+    Folds case, punctuation and whitespace, so "Exam  schedule?" and "exam schedule" compare equal.
+    """
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
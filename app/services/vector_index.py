@@ -0,0 +1,481 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k largest scores, best first.
+    Uses a partial selection so only the k winners get sorted.
+    """
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row-wise top_k for a (queries x rows) score matrix: positions of each row's k best, best first.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+class ExactIndex:
+    """
+    Brute-force cosine index over L2-normalized vectors, keyed by string id.
+    Every search scores all rows; this is the reference the approximate indexes are measured against.
+    """
+    kind = "exact"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        # Row storage grows by doubling so appends are amortized O(1). It may also be a
+        # read-only memory map (see attach), which is copied on the first write.
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:len(self.ids)]
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._vectors.shape[0] and self._vectors.flags.writeable:
+            return
+        grown = np.zeros((max(size, 2 * self._vectors.shape[0], 16), self.dim), dtype=np.float32)
+        grown[:len(self.ids)] = self.vectors
+        self._vectors = grown
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Inserts vectors, replacing the stored vector for ids that already exist.
+        """
+        self._reserve(len(self.ids) + len(ids))
+        rows = np.empty(len(ids), dtype=np.int64)
+        for i, id in enumerate(ids):
+            row = self.rows.get(id)
+            if row is None:
+                row = len(self.ids)
+                self.rows[id] = row
+                self.ids.append(id)
+            rows[i] = row
+        self._write_rows(rows, vectors)
+        self._on_rows_set(rows)
+
+    def remove(self, id: str) -> bool:
+        """
+        Drops an id. The last row is moved into the freed slot, so removal does not shift the matrix.
+        """
+        if id not in self.rows:
+            return False
+        self._reserve(len(self.ids))
+        row = self.rows.pop(id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+            self._move_row(last, row)
+            self._on_row_moved(last, row)
+        self.ids.pop()
+        self._on_row_removed(last)
+        return True
+
+    def clear(self) -> None:
+        self.ids = []
+        self.rows = {}
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+
+    def attach(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Replaces the contents with `vectors` without copying them, so a read-only
+        memory map stays shared between processes until the index is modified.
+        """
+        self.clear()
+        self.ids = list(ids)
+        self.rows = {id: i for i, id in enumerate(self.ids)}
+        self._vectors = vectors
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held privately by the row storage. A shared read-only memory map counts as zero.
+        """
+        return 0 if isinstance(self._vectors, np.memmap) else self._vectors.nbytes
+
+    # Row storage; overridden by indexes that keep vectors in another form
+    def _write_rows(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        self._vectors[rows] = vectors
+
+    def _move_row(self, old_row: int, new_row: int) -> None:
+        self._vectors[new_row] = self._vectors[old_row]
+
+    # Hooks for subclasses that keep per-row bookkeeping
+    def _on_rows_set(self, rows: np.ndarray) -> None: pass
+    def _on_row_moved(self, old_row: int, new_row: int) -> None: pass
+    def _on_row_removed(self, row: int) -> None: pass
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        """
+        Returns the ids and scores of the k best rows for a normalized query, best first.
+        """
+        if not self.ids:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = self.vectors @ query
+        order = top_k(scores, k)
+        return [self.ids[i] for i in order], scores[order]
+
+    def score_ids(self, ids: Sequence[str], query: np.ndarray) -> np.ndarray:
+        """
+        Scores of a normalized query against the given (indexed) ids only.
+        """
+        return self._vectors[[self.rows[id] for id in ids]] @ query
+
+    def search_batch(self, queries: np.ndarray, k: int, chunk: int = 256) -> List[Tuple[List[str], np.ndarray]]:
+        """
+        `search` for many queries at once: one matrix multiply per `chunk` queries,
+        which bounds the size of the score matrix on large corpora.
+        """
+        if not self.ids:
+            return [([], np.zeros(0, dtype=np.float32)) for _ in range(len(queries))]
+        results = []
+        vectors = self.vectors
+        for start in range(0, len(queries), chunk):
+            scores = queries[start:start + chunk] @ vectors.T
+            order = top_k_rows(scores, k)
+            best = np.take_along_axis(scores, order, axis=1)
+            results.extend(([self.ids[i] for i in rows], row_scores) for rows, row_scores in zip(order, best))
+        return results
+
+class QuantizedIndex(ExactIndex):
+    """
+    Exact scan over compact vectors: float16, or int8 with one float32 scale per vector
+    (x ~= scale * code, scale = max|x| / 127). That is 2x or ~4x less memory than float32.
+
+    Scoring reads the compact matrix and widens it to float32 a block at a time (numpy has
+    no fast float16/int8 matrix multiply), so only one block is ever expanded. Blocks are
+    small enough to stay in the CPU cache between the widening and the multiply: that keeps
+    int8 about as fast as a float32 scan even for a single query. Widening float16 has no
+    fast path in numpy, so it scores several times slower than float32 and only saves
+    memory; int8 is the better choice for latency. With `rerank` > 0
+    the best `rerank` candidates are rescored against the float32 vectors, which gives the
+    exact order at the top; those vectors are then kept too, ideally as the shared memory
+    map of the embedding store (see attach) so they cost no private memory.
+    """
+    BLOCK_ROWS = 1024  # 1024 x 384 float32 is 1.5 MiB
+
+    def __init__(self, dim: int, precision: str = "int8", rerank: int = 0):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unknown embedding precision: {precision}")
+        super().__init__(dim)
+        self.kind = precision
+        self.precision = precision
+        self.rerank = rerank
+        self._codes = np.zeros((0, dim), dtype=np.int8 if precision == "int8" else np.float16)
+        self._scales = np.ones(0, dtype=np.float32)
+
+    def quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.precision == "float16":
+            return vectors.astype(np.float16), np.ones(vectors.shape[0], dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        Float32 vectors: the originals if they are kept for re-ranking, otherwise decoded from the compact form.
+        """
+        n = len(self.ids)
+        if self.rerank:
+            return self._vectors[:n]
+        return self._codes[:n].astype(np.float32) * self._scales[:n, None]
+
+    @property
+    def nbytes(self) -> int:
+        compact = self._codes.nbytes + (self._scales.nbytes if self.precision == "int8" else 0)
+        return compact + (super().nbytes if self.rerank else 0)
+
+    def _reserve(self, size: int) -> None:
+        if self.rerank:
+            super()._reserve(size)
+        if size > self._codes.shape[0]:
+            capacity = max(size, 2 * self._codes.shape[0], 16)
+            codes = np.zeros((capacity, self.dim), dtype=self._codes.dtype)
+            scales = np.ones(capacity, dtype=np.float32)
+            codes[:len(self.ids)] = self._codes[:len(self.ids)]
+            scales[:len(self.ids)] = self._scales[:len(self.ids)]
+            self._codes, self._scales = codes, scales
+
+    def _write_rows(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        self._codes[rows], self._scales[rows] = self.quantize(vectors)
+        if self.rerank:
+            super()._write_rows(rows, vectors)
+
+    def _move_row(self, old_row: int, new_row: int) -> None:
+        self._codes[new_row] = self._codes[old_row]
+        self._scales[new_row] = self._scales[old_row]
+        if self.rerank:
+            super()._move_row(old_row, new_row)
+
+    def clear(self) -> None:
+        super().clear()
+        self._codes = np.zeros((0, self.dim), dtype=self._codes.dtype)
+        self._scales = np.ones(0, dtype=np.float32)
+
+    def attach(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Quantizes `vectors`. With re-ranking on, they are also kept without copying, so a
+        memory-mapped store serves the exact rescoring from the shared page cache.
+        """
+        self.clear()
+        self._reserve(len(ids))
+        for start in range(0, len(ids), self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, len(ids))
+            self._codes[start:end], self._scales[start:end] = self.quantize(vectors[start:end])
+        self.ids = list(ids)
+        self.rows = {id: i for i, id in enumerate(self.ids)}
+        if self.rerank:
+            self._vectors = vectors
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Approximate (queries x rows) scores computed from the compact vectors.
+        """
+        n = len(self.ids)
+        scores = np.empty((queries.shape[0], n), dtype=np.float32)
+        for start in range(0, n, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, n)
+            block = self._codes[start:end].astype(np.float32) @ queries.T
+            if self.precision == "int8":
+                block *= self._scales[start:end, None]
+            scores[:, start:end] = block.T
+        return scores
+
+    def _select(self, scores: np.ndarray, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if not self.rerank:
+            order = top_k(scores, k)
+            return [self.ids[i] for i in order], scores[order]
+        candidates = top_k(scores, max(k, self.rerank))
+        exact = self._vectors[candidates] @ query
+        order = top_k(exact, k)
+        return [self.ids[i] for i in candidates[order]], exact[order]
+
+    def score_ids(self, ids: Sequence[str], query: np.ndarray) -> np.ndarray:
+        rows = [self.rows[id] for id in ids]
+        if self.rerank:
+            return self._vectors[rows] @ query
+        return (self._codes[rows].astype(np.float32) @ query) * self._scales[rows]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if not self.ids:
+            return [], np.zeros(0, dtype=np.float32)
+        return self._select(self._scores(query[None, :])[0], query, k)
+
+    def search_batch(self, queries: np.ndarray, k: int, chunk: int = 256) -> List[Tuple[List[str], np.ndarray]]:
+        if not self.ids:
+            return [([], np.zeros(0, dtype=np.float32)) for _ in range(len(queries))]
+        results = []
+        for start in range(0, len(queries), chunk):
+            block = queries[start:start + chunk]
+            scores = self._scores(block)
+            results.extend(self._select(row, query, k) for row, query in zip(scores, block))
+        return results
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file approximate index.
+
+    Vectors are clustered with spherical k-means into `n_lists` cells; a search only
+    scores the rows of the `n_probe` cells closest to the query. More probes means
+    better recall and slower searches. Below `min_train_size` rows it behaves exactly
+    like ExactIndex, and it retrains itself once the corpus has grown 4x since training.
+    """
+    kind = "ivf"
+
+    def __init__(self, dim: int, n_lists: int = 0, n_probe: int = 8, min_train_size: int = 10000,
+                 train_iterations: int = 10, seed: int = 0):
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.train_iterations = train_iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        # Cell of every row, plus rows grouped by cell (rebuilt lazily after updates)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._list_rows = np.zeros(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        self._lists_dirty = False
+
+    def _reserve(self, size: int) -> None:
+        super()._reserve(size)
+        if self._assign.shape[0] < self._vectors.shape[0]:
+            grown = np.zeros(self._vectors.shape[0], dtype=np.int32)
+            grown[:self._assign.shape[0]] = self._assign
+            self._assign = grown
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        super().add(ids, vectors)
+        if len(self.ids) >= self.min_train_size and (
+                self.centroids is None or len(self.ids) >= 4 * self.trained_size):
+            self.train()
+
+    def attach(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        super().attach(ids, vectors)
+        self._assign = np.zeros(len(self.ids), dtype=np.int32)
+        if len(self.ids) >= self.min_train_size:
+            self.train()
+
+    def clear(self) -> None:
+        super().clear()
+        self.centroids = None
+        self.trained_size = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists_dirty = False
+
+    def _on_rows_set(self, rows: np.ndarray) -> None:
+        if self.centroids is not None and rows.size:
+            self._assign[rows] = self._assign_rows(self._vectors[rows])
+            self._lists_dirty = True
+
+    def _on_row_moved(self, old_row: int, new_row: int) -> None:
+        self._assign[new_row] = self._assign[old_row]
+        self._lists_dirty = True
+
+    def _on_row_removed(self, row: int) -> None:
+        self._lists_dirty = True
+
+    def _assign_rows(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], chunk):
+            out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self) -> None:
+        """
+        Runs spherical k-means on a sample of the stored vectors and reassigns every row.
+        """
+        vectors = self.vectors
+        n = vectors.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(n, size=min(n, 64 * n_lists), replace=False)]
+
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty cells with random sample points
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = n
+        self._assign[:n] = self._assign_rows(vectors)
+        self._lists_dirty = True
+
+    def _rebuild_lists(self) -> None:
+        assign = self._assign[:len(self.ids)]
+        self._list_rows = np.argsort(assign, kind="stable")
+        self._list_offsets = np.searchsorted(assign[self._list_rows], np.arange(self.centroids.shape[0] + 1))
+        self._lists_dirty = False
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        if self.centroids is None:
+            return super().search(query, k)
+        if self._lists_dirty:
+            self._rebuild_lists()
+
+        probes = top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([
+            self._list_rows[self._list_offsets[cell]:self._list_offsets[cell + 1]] for cell in probes
+        ])
+        if candidates.size == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = self._vectors[candidates] @ query
+        order = top_k(scores, k)
+        return [self.ids[i] for i in candidates[order]], scores[order]
+
+    def search_batch(self, queries: np.ndarray, k: int, chunk: int = 256) -> List[Tuple[List[str], np.ndarray]]:
+        # Each query probes different cells, so only the untrained (exact) case batches
+        if self.centroids is None:
+            return super().search_batch(queries, k, chunk)
+        return [self.search(query, k) for query in queries]
+
+def create_index(kind: str, dim: int, precision: str = "float32", rerank: int = 0, **options) -> ExactIndex:
+    """
+    Builds an index by name ("exact" or "ivf"). A `precision` of "float16" or "int8"
+    stores the exact index compactly (see QuantizedIndex).
+    """
+    if precision != "float32":
+        if kind != "exact":
+            raise ValueError(f"EMBEDDING_PRECISION={precision} is only supported by the exact index")
+        return QuantizedIndex(dim, precision=precision, rerank=rerank)
+    if kind == "exact":
+        return ExactIndex(dim)
+    if kind == "ivf":
+        return IVFIndex(dim, **options)
+    raise ValueError(f"Unknown vector index: {kind}")
+
+def recall_report(index: ExactIndex, queries: np.ndarray, k: int = 10, exact: Optional[ExactIndex] = None) -> dict:
+    """
+    Compares `index` against an exact scan over the same vectors (or against `exact`,
+    e.g. the float32 originals of a quantized index).
+    Returns recall@k (fraction of the exact top-k that the index also returned),
+    top-1 agreement and mean per-query latency of both.
+    """
+    if exact is None:
+        exact = ExactIndex(index.dim)
+        exact.ids, exact.rows, exact._vectors = index.ids, index.rows, index.vectors
+
+    hits = top1 = 0
+    exact_time = index_time = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        expected, _ = exact.search(query, k)
+        exact_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found, _ = index.search(query, k)
+        index_time += time.perf_counter() - start
+
+        hits += len(set(expected) & set(found))
+        top1 += bool(found) and bool(expected) and found[0] == expected[0]
+
+    n = max(1, len(queries))
+    return {
+        "index": index.kind,
+        "size": len(index),
+        "k": k,
+        "queries": len(queries),
+        f"recall@{k}": hits / max(1, n * min(k, len(index))),
+        "top1_agreement": top1 / n,
+        "exact_ms": 1000 * exact_time / n,
+        "index_ms": 1000 * index_time / n,
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import traceback
+from typing import Optional
+from app.core.config import settings
+from app.services.batch_encoder import query_encoder
+from app.services.exact_match import exact_matcher
+from app.services.nlp_engine import nlp_engine
+from app.services.spell_checker import spell_corrector
+
+class WarmUp:
+    """
+    Loads the spell checker, the NLP model and the FAQ index in the background after
+    startup, then runs a warm-up inference. Drives the /readyz endpoint.
+
+    A failed attempt (e.g. the database not up yet) is retried after `retry_seconds`,
+    doubling up to `max_retry_seconds`. Requests only wait for an attempt in progress,
+    not for the back-off between attempts.
+    """
+
+    def __init__(self, retry_seconds: float = 5.0, max_retry_seconds: float = 300.0):
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.task: Optional[asyncio.Task] = None
+        self.attempt: Optional[asyncio.Task] = None
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    def start(self, repository) -> None:
+        self.task = asyncio.get_running_loop().create_task(self._run(repository))
+
+    async def _run(self, repository) -> None:
+        delay = self.retry_seconds
+        while True:
+            self.attempts += 1
+            self.attempt = asyncio.get_running_loop().create_task(self._attempt(repository))
+            if await self.attempt:
+                return
+            print(f"Warm-up failed, retrying in {delay:.0f}s.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_seconds)
+
+    async def _attempt(self, repository) -> bool:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, spell_corrector.load)
+            await loop.run_in_executor(None, nlp_engine.load)
+            snapshot = await repository.snapshot()
+            faqs = snapshot.faqs()
+            await loop.run_in_executor(None, spell_corrector.build_vocabulary, faqs)
+            exact_matcher.build(faqs)
+            await loop.run_in_executor(None, nlp_engine.build_index, faqs)
+            nlp_engine.corpus_version = snapshot.version
+
+            # Warm-up inference, so the first real query does not pay for lazy initialization
+            spell_corrector.correct_text("warm up")
+            await query_encoder.encode("warm up")
+
+            self.seconds = time.perf_counter() - start
+            self.error = None
+            print(f"Warm-up complete in {self.seconds:.1f}s.")
+            return True
+        except Exception as e:
+            self.error = str(e)
+            traceback.print_exc()
+            return False
+
+    async def wait(self) -> None:
+        """
+        Requests that arrive during warm-up wait for it instead of loading the model in parallel.
+        """
+        attempt = self.attempt
+        if attempt and not attempt.done() and attempt.get_loop() is asyncio.get_running_loop():
+            await asyncio.shield(attempt)
+
+    async def stop(self) -> None:
+        for task in (self.task, self.attempt):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    @property
+    def ready(self) -> bool:
+        return nlp_engine.index_ready and spell_corrector.is_loaded
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "model_loaded": nlp_engine.is_loaded,
+            "index_loaded": nlp_engine.index_ready,
+            "index_size": len(nlp_engine.index) if nlp_engine.is_loaded else 0,
+            "spell_checker_loaded": spell_corrector.is_loaded,
+            "warmup_seconds": self.seconds,
+            "warmup_attempts": self.attempts,
+            "error": self.error,
+        }
+
+# Global instance
+warm_up = WarmUp(settings.WARMUP_RETRY_SECONDS, settings.WARMUP_RETRY_MAX_SECONDS)
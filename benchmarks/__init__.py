@@ -0,0 +1,18 @@
+"""
+Benchmarks for the /api/chat pipeline.
+
+    python -m benchmarks.stages --sizes 100,1000,10000,100000   # per-stage microbenchmarks
+    python -m benchmarks.load --faqs 1000 --requests 2000        # HTTP load against the ASGI app
+
+Both run offline on synthetic FAQ corpora: unless the environment says otherwise they use
+the deterministic "hash" encoder backend, a throw-away JSON database and no embedding store.
+Set ENCODER_BACKEND=torch to include the real model's cost.
+"""
+import os
+import tempfile
+
+# Settings and the global database are created when `app` is first imported, so this has to run before
+os.environ.setdefault("ENCODER_BACKEND", "hash")
+os.environ.setdefault("EMBEDDING_STORE_PATH", "")
+os.environ.setdefault("USE_JSON_DB", "true")
+os.environ.setdefault("Json_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="chatbot-bench-"), "db.json"))
@@ -0,0 +1,81 @@
+import random
+from typing import List
+from app.models.faq import FAQ
+
+# Campus-flavoured building blocks; every FAQ index maps to a distinct combination
+TEMPLATES = [
+    "How do I {verb} the {subject}{qualifier}?",
+    "Where can I {verb} the {subject}{qualifier}?",
+    "When can students {verb} the {subject}{qualifier}?",
+    "Who should I contact to {verb} the {subject}{qualifier}?",
+    "Is it possible to {verb} the {subject}{qualifier}?",
+    "What is the deadline to {verb} the {subject}{qualifier}?",
+    "Can I {verb} the {subject} online{qualifier}?",
+    "What documents are needed to {verb} the {subject}{qualifier}?",
+]
+VERBS = ["apply for", "renew", "cancel", "pay for", "register for", "access", "update", "download",
+         "book", "reset", "request", "check"]
+SUBJECTS = ["library card", "hostel room", "bus pass", "exam hall ticket", "scholarship", "student portal password",
+            "wifi account", "transcript", "bonafide certificate", "fee receipt", "lab slot", "sports membership",
+            "parking permit", "medical leave", "course registration", "id card", "timetable", "re-exam",
+            "internship letter", "mess plan", "locker", "printing quota", "email account", "alumni card"]
+QUALIFIERS = ["", " this semester", " after the deadline", " for first year students", " during holidays",
+              " as an exchange student", " for the summer term", " from outside campus", " for a lost card",
+              " in the evening", " as a part-time student", " for postgraduate courses"]
+DEPARTMENTS = ["", "engineering", "science", "commerce", "arts", "law", "medicine", "management", "design",
+               "architecture", "pharmacy", "education", "agriculture", "journalism", "music", "nursing"]
+ANSWER_PARTS = ["Visit the {office} office with your student ID.", "Use the {office} section of the Student Portal.",
+                "Requests are processed within {days} working days.", "A fee of {fee} applies.",
+                "Email {office}@college.edu for help.", "Bring a passport photo and your admission letter."]
+OFFICES = ["admin", "accounts", "library", "hostel", "transport", "exam", "it", "student affairs"]
+UNKNOWN_QUERIES = ["what is the meaning of life", "best pizza near me", "weather tomorrow",
+                   "who won the football match", "recommend a good movie", "quantum chromodynamics lecture notes"]
+
+def synthetic_faqs(n: int, seed: int = 0) -> List[FAQ]:
+    """
+    `n` distinct FAQs (questions are unique up to several hundred thousand).
+    """
+    rng = random.Random(seed)
+    faqs = []
+    for i in range(n):
+        rest, template = divmod(i, len(TEMPLATES))
+        rest, verb = divmod(rest, len(VERBS))
+        rest, subject = divmod(rest, len(SUBJECTS))
+        rest, qualifier = divmod(rest, len(QUALIFIERS))
+        department = DEPARTMENTS[rest % len(DEPARTMENTS)]
+        question = TEMPLATES[template].format(
+            verb=VERBS[verb], subject=f"{department} {SUBJECTS[subject]}".strip(), qualifier=QUALIFIERS[qualifier])
+        answer = " ".join(
+            part.format(office=rng.choice(OFFICES), days=rng.randint(1, 10), fee=f"Rs. {rng.randint(1, 20) * 50}")
+            for part in rng.sample(ANSWER_PARTS, 3)
+        )
+        faqs.append(FAQ(question=question, answer=answer))
+    return faqs
+
+def add_typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]  # deletion
+    if kind == 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]  # transposition
+    return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]  # substitution
+
+def synthetic_queries(faqs: List[FAQ], n: int, typo_rate: float = 0.2, unknown_rate: float = 0.1,
+                      seed: int = 1) -> List[str]:
+    """
+    User-like queries: FAQ questions with words dropped and typos, plus some off-topic ones.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if not faqs or rng.random() < unknown_rate:
+            queries.append(rng.choice(UNKNOWN_QUERIES))
+            continue
+        words = rng.choice(faqs).question.rstrip("?").split()
+        words = [w for w in words if rng.random() > 0.15] or words
+        words = [add_typo(w, rng) if rng.random() < typo_rate else w for w in words]
+        queries.append(" ".join(words).lower())
+    return queries
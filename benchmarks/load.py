@@ -0,0 +1,81 @@
+"""
+HTTP load generator for /api/chat.
+
+By default the app runs in-process (httpx's ASGI transport, startup/shutdown hooks
+included) against a throw-away JSON database seeded with a synthetic corpus, so the
+numbers cover routing, validation and the whole chat pipeline without network noise.
+With --url it targets a running server instead (seed that server separately).
+
+Usage: python -m benchmarks.load [--faqs 1000] [--requests 2000] [--concurrency 32]
+                                 [--distinct 500] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+import httpx
+from benchmarks.corpus import synthetic_faqs, synthetic_queries
+from benchmarks.timing import summarize
+
+async def drive(client: httpx.AsyncClient, queries, requests: int, concurrency: int):
+    latencies, statuses = [], Counter()
+    rng = random.Random(2)
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            query = rng.choice(queries)
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/chat", json={"query": query})
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+async def run(args):
+    faqs = synthetic_faqs(args.faqs)
+    queries = synthetic_queries(faqs, args.distinct)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            elapsed, latencies, statuses = await drive(client, queries, args.requests, args.concurrency)
+    else:
+        from app.core.database import db
+        from app.main import app
+        from app.services.warmup import warm_up
+
+        await db.connect()
+        await db.add_faqs(faqs)
+        await app.router.startup()
+        await warm_up.wait()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # One untimed request per distinct query would hide the cache; a single one just primes the app
+            await client.post("/api/chat", json={"query": "warm up"})
+            elapsed, latencies, statuses = await drive(client, queries, args.requests, args.concurrency)
+        await app.router.shutdown()
+
+    stats = summarize(latencies)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.distinct} distinct queries, "
+          f"{args.faqs} FAQs{f' ({args.url})' if args.url else ' (in-process)'}")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print(f"latency: mean={stats['mean']:.2f}ms p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms p99={stats['p99']:.2f}ms")
+    print(f"responses: {dict(statuses)}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faqs", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=500, help="size of the query pool (controls cache hits)")
+    parser.add_argument("--url", default=None)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Per-stage microbenchmarks of the /api/chat pipeline over synthetic corpora.
+
+Usage: python -m benchmarks.stages [--sizes 100,1000,10000,100000] [--queries 500]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from benchmarks.corpus import synthetic_faqs, synthetic_queries
+from benchmarks.timing import print_header, print_row, summarize, time_each, time_each_async
+from app.core.config import settings
+from app.core.database import JsonDatabase
+from app.core.repository import FAQRepository
+from app.models.faq import QueryLog
+from app.services.lexical_index import BM25Index
+from app.services.log_sink import QueryLogSink
+from app.services.nlp_engine import NLPEngine
+from app.services.spell_checker import spell_corrector
+
+def bench_spell(size, faqs, queries):
+    start = time.perf_counter()
+    spell_corrector.build_vocabulary(faqs)
+    print_row("spell: build vocabulary", size, summarize([time.perf_counter() - start]))
+    print_row("spell: correct (cold)", size, summarize(time_each(spell_corrector.correct_text, queries)))
+    print_row("spell: correct (memoized)", size, summarize(time_each(spell_corrector.correct_text, queries)))
+
+async def bench_fetch(size, db, queries):
+    repo = FAQRepository(db, refresh_seconds=settings.SNAPSHOT_REFRESH_SECONDS)
+    await repo.snapshot()
+    print_row("fetch: snapshot (warm)", size, summarize(await time_each_async(lambda _: repo.snapshot(), queries)))
+    print_row("fetch: snapshot reload", size, summarize(await time_each_async(lambda _: repo.refresh(), range(5))))
+    print_row("fetch: db.get_all_faqs", size, summarize(await time_each_async(lambda _: db.get_all_faqs(), range(5))))
+
+def bench_encode(size, engine, queries):
+    print_row("encode: one query", size, summarize(time_each(lambda q: engine.encode([q]), queries)))
+    batches = [queries[i:i + 32] for i in range(0, len(queries), 32)]
+    samples = time_each(engine.encode, batches)
+    print_row("encode: batch of 32 (per q)", size, summarize([s / 32 for s in samples]))
+
+def bench_scoring(size, engine, faqs, queries):
+    start = time.perf_counter()
+    engine.build_index(faqs)
+    print_row(f"score: build {engine.index.kind} index", size, summarize([time.perf_counter() - start]))
+    embeddings = engine.encode(queries)
+    print_row("score: rank top-3", size, summarize(time_each(lambda e: engine.rank_embedding(e, k=3), embeddings)))
+    samples = time_each(lambda block: engine.rank_embeddings(block, k=3), [embeddings[i:i + 64] for i in range(0, len(embeddings), 64)])
+    print_row("score: rank batch of 64 (per q)", size, summarize([s / 64 for s in samples]))
+
+    # Hybrid retrieval: BM25 shortlist, then cosine over the shortlisted FAQs only
+    lexical = BM25Index()
+    start = time.perf_counter()
+    for faq in faqs:
+        lexical.add(faq.id, engine.faq_text(faq))
+    print_row("score: build BM25 index", size, summarize([time.perf_counter() - start]))
+    engine.lexical = lexical
+    print_row("score: hybrid rank top-3", size, summarize(
+        time_each(lambda pair: engine.rank_embedding(pair[0], k=3, threshold=0.65, text=pair[1]), list(zip(embeddings, queries)))))
+    stats = engine.hybrid_stats
+    print(f"    hybrid: {stats['shortlist']} answered from the shortlist, {stats['full_scan']} full scans")
+    engine.lexical = None
+
+async def bench_logging(size, db, queries):
+    logs = [QueryLog(query=q, response="benchmark", score=0.5) for q in queries]
+    print_row("log: direct write", size, summarize(await time_each_async(db.log_query, logs)))
+
+    sink = QueryLogSink(max_queue=len(logs) + 1, batch_size=settings.LOG_BATCH_SIZE,
+                        flush_interval=settings.LOG_FLUSH_INTERVAL_SECONDS)
+    sink.start(db)
+    print_row("log: sink submit", size, summarize(time_each(sink.submit, logs)))
+    start = time.perf_counter()
+    await sink.stop()
+    print_row("log: sink drain (per log)", size, summarize([(time.perf_counter() - start) / len(logs)]))
+
+async def run(sizes, n_queries):
+    directory = tempfile.mkdtemp(prefix="chatbot-bench-")
+    print(f"encoder backend: {settings.ENCODER_BACKEND}, vector index: {settings.VECTOR_INDEX}, "
+          f"precision: {settings.EMBEDDING_PRECISION}")
+    spell_corrector.load()  # the dictionary load is a one-off startup cost, not part of any stage
+    print_header()
+    for size in sizes:
+        faqs = synthetic_faqs(size)
+        queries = synthetic_queries(faqs, n_queries)
+
+        settings.Json_DB_PATH = os.path.join(directory, f"faqs-{size}.json")
+        db = JsonDatabase()
+        await db.connect()
+        await db.add_faqs(faqs)
+
+        engine = NLPEngine()
+        engine.load()
+        bench_spell(size, faqs, queries)
+        await bench_fetch(size, db, queries)
+        bench_encode(size, engine, queries)
+        bench_scoring(size, engine, faqs, queries)
+        await bench_logging(size, db, queries)
+        await db.disconnect()
+        print()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run([int(s) for s in args.sizes.split(",")], args.queries))
+
+if __name__ == "__main__":
+    main()
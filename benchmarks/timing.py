@@ -0,0 +1,41 @@
+import time
+from typing import Callable, Iterable, List
+import numpy as np
+
+def summarize(samples: List[float]) -> dict:
+    """
+    Latency summary in milliseconds for samples given in seconds.
+    """
+    if not samples:
+        return {"n": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ms = 1000 * np.asarray(samples)
+    return {
+        "n": len(samples),
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+    }
+
+def time_each(fn: Callable, items: Iterable) -> List[float]:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+async def time_each_async(fn: Callable, items: Iterable) -> List[float]:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        await fn(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def print_row(stage: str, size: int, stats: dict) -> None:
+    print(f"{stage:<32} {size:>7} {stats['n']:>6} {stats['mean']:>10.3f} {stats['p50']:>10.3f} "
+          f"{stats['p95']:>10.3f} {stats['p99']:>10.3f}")
+
+def print_header() -> None:
+    print(f"{'stage':<32} {'faqs':>7} {'n':>6} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
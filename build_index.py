@@ -0,0 +1,36 @@
+import asyncio
+import time
+from collections import defaultdict
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.faq import DEFAULT_KB_ID
+from app.services.knowledge_bases import knowledge_bases
+
+async def build_index():
+    """
+    Pre-computes the on-disk FAQ embedding stores, so API workers start without encoding.
+    Every knowledge base gets its own store (EMBEDDING_STORE_PATH for the default one,
+    EMBEDDING_STORE_PATH-kb-<id> for the others, as knowledge_bases.py loads them).
+    Run it after seeding and before deploying; only new or changed FAQs are encoded.
+    """
+    if not settings.EMBEDDING_STORE_PATH:
+        print("EMBEDDING_STORE_PATH is not set, nothing to build.")
+        return
+
+    db = get_db()
+    await db.connect()
+    by_kb = defaultdict(list)
+    for faq in await db.get_all_faqs():
+        by_kb[faq.kb_id].append(faq)
+    await db.disconnect()
+
+    by_kb.setdefault(DEFAULT_KB_ID, [])
+    for kb_id, faqs in sorted(by_kb.items(), key=lambda item: item[0] != DEFAULT_KB_ID):
+        engine = knowledge_bases.get(kb_id).engine
+        start = time.perf_counter()
+        engine.build_index(faqs)
+        print(f"Done! Embedding store for {len(faqs)} FAQs of knowledge base {kb_id!r} written to "
+              f"{engine.store.path} in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    asyncio.run(build_index())
@@ -28,7 +28,9 @@ async def test_startup():
     try:
         from app.services.nlp_engine import nlp_engine
         print("NLP Engine loaded.")
-        match = nlp_engine.find_best_match("hello", ["hello world", "goodbye"])
+        nlp_engine.build_index(faqs)
+        print(f"FAQ index size: {nlp_engine.index_size}")
+        match = nlp_engine.find_best_match("hello")
         print(f"Match result: {match}")
     except Exception:
         traceback.print_exc()
@@ -0,0 +1,51 @@
+"""
+Parity check of an encoder backend against the float32 reference encoder.
+
+Encodes the FAQ questions and answers from the configured database with both and reports
+the cosine drift, per-text encode time, and how often a question's best FAQ changes.
+
+Usage: python encoder_report.py [--backend torch-int8] [--threads N]
+"""
+import argparse
+import asyncio
+from app.core.config import settings
+from app.core.database import get_db
+from app.services.encoders import create_encoder, parity_report
+from app.services.nlp_engine import NLPEngine
+
+async def load_faqs():
+    db = get_db()
+    await db.connect()
+    faqs = await db.get_all_faqs()
+    await db.disconnect()
+    return faqs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default=settings.ENCODER_BACKEND)
+    parser.add_argument("--threads", type=int, default=settings.ENCODER_THREADS)
+    args = parser.parse_args()
+
+    faqs = asyncio.run(load_faqs())
+    if not faqs:
+        print("No FAQs to check against.")
+        return
+
+    model_name = NLPEngine().model_name
+    reference = create_encoder("torch", model_name, threads=args.threads)
+    candidate = create_encoder(args.backend, model_name, threads=args.threads)
+    reference.load()
+    candidate.load()
+
+    corpus = reference.encode([NLPEngine.faq_text(faq) for faq in faqs])
+    # Encode once untimed so one-off setup does not count against either side
+    parity_report(reference, candidate, ["warm up"])
+    report = parity_report(reference, candidate, [faq.question for faq in faqs], corpus=corpus)
+
+    print(f"{args.backend} vs torch on {report['texts']} FAQ questions ({args.threads or 'default'} threads)")
+    print(f"cosine drift: mean={report['mean_drift']:.5f} p99={report['p99_drift']:.5f} max={report['max_drift']:.5f}")
+    print(f"encode: reference={report['reference_ms']:.2f}ms candidate={report['candidate_ms']:.2f}ms per text")
+    print(f"top-1 FAQ agreement: {report['top1_agreement']:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Memory and accuracy report for compact (float16 / int8) embedding storage.
+
+By default it embeds the FAQs in the configured database and uses each FAQ's question
+as a query, so "top-1 changes" are questions whose best FAQ differs from the float32
+index. With --synthetic N it uses a clustered synthetic corpus instead (no model needed)
+to show memory and latency at scale. Latency is reported for batched queries (/chat/batch)
+and for one query at a time (/chat).
+
+Usage: python quantization_report.py [--synthetic N] [--rerank R]
+"""
+import argparse
+import asyncio
+import time
+from app.services.vector_index import ExactIndex, QuantizedIndex, recall_report
+
+async def load_faq_set():
+    from app.core.database import get_db
+    from app.services.nlp_engine import nlp_engine
+
+    db = get_db()
+    await db.connect()
+    faqs = await db.get_all_faqs()
+    await db.disconnect()
+    corpus = nlp_engine.encode([nlp_engine.faq_text(faq) for faq in faqs])
+    queries = nlp_engine.encode([faq.question for faq in faqs])
+    return [faq.id for faq in faqs], corpus, queries, [faq.question for faq in faqs]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="corpus size of a synthetic run")
+    parser.add_argument("--rerank", type=int, default=20, help="candidates rescored in float32")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from index_report import synthetic_vectors
+        vectors = synthetic_vectors(args.synthetic + 200)
+        corpus, queries = vectors[:args.synthetic], vectors[args.synthetic:]
+        ids = [str(i) for i in range(args.synthetic)]
+        labels = None
+    else:
+        ids, corpus, queries, labels = asyncio.run(load_faq_set())
+    if not ids:
+        print("No FAQs to report on.")
+        return
+
+    exact = ExactIndex(corpus.shape[1])
+    exact.add(ids, corpus)
+    start = time.perf_counter()
+    expected = [found[0] for found, _ in exact.search_batch(queries, k=1)]
+    elapsed = 1000 * (time.perf_counter() - start) / len(queries)
+    single = recall_report(exact, queries[:200], k=10, exact=exact)["index_ms"]
+    print(f"{len(ids)} vectors x {corpus.shape[1]} dims, {len(queries)} queries")
+    print(f"float32            memory={exact.nbytes / 1024:10.1f} KiB batch={elapsed:.3f}ms/query "
+          f"single={single:.3f}ms/query")
+
+    for precision in ("float16", "int8"):
+        for rerank in (0, args.rerank):
+            index = QuantizedIndex(corpus.shape[1], precision=precision, rerank=rerank)
+            index.add(ids, corpus)
+            # Re-ranking reads the float32 rows; in the app they come from the shared memory-mapped store
+            compact = index.nbytes - (index._vectors.nbytes if rerank else 0)
+
+            start = time.perf_counter()
+            found = [result[0] for result, _ in index.search_batch(queries, k=1)]
+            elapsed = 1000 * (time.perf_counter() - start) / len(queries)
+
+            changed = [i for i, (a, b) in enumerate(zip(expected, found)) if a != b]
+            report = recall_report(index, queries[:200], k=10, exact=exact)
+            name = f"{precision}{f' +rerank{rerank}' if rerank else ''}"
+            print(f"{name:<18} memory={compact / 1024:10.1f} KiB (saved {100 * (1 - compact / exact.nbytes):4.1f}%) "
+                  f"recall@10={report['recall@10']:.3f} top1 changes={len(changed)}/{len(queries)} "
+                  f"batch={elapsed:.3f}ms/query single={report['index_ms']:.3f}ms/query")
+            if labels:
+                for i in changed[:10]:
+                    print(f"    changed: {labels[i]!r}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import asyncio
 from app.core.database import get_db
 from app.models.faq import FAQ
+from app.services.bulk_import import question_key
 
 async def seed_bulk_data():
     db = get_db()
@@ -49,32 +50,26 @@ Can I change my registered email ID? | Yes, but it requires admin approval.
 My portal is showing an error. What should I do? | Clear your browser cache. If the issue persists, contact IT Support.
 """
     
-    # Parse and insert
-    lines = raw_data.strip().split('\n')
-    count = 0
-    for line in lines:
+    # Parse, skip questions already in the DB (or repeated here), then insert in one batch
+    existing_keys = {question_key(faq.question) for faq in await db.get_all_faqs()}
+    new_faqs = []
+    for line in raw_data.strip().split('\n'):
         if '|' in line:
             parts = line.split('|')
             q = parts[0].strip()
             a = parts[1].strip()
-            
-            # Check for duplicates (simple check)
-            # ideally we check DB, but to go fast we just insert. 
-            # The user might have older data, this adds more or duplicates. 
-            # For a proper seed we might want to plain clear or check existence.
-            # Let's check existence by question string match
-            
-            existing = await db.get_all_faqs()
-            exists = any(faq.question == q for faq in existing)
-            
-            if not exists:
-                await db.add_faq(FAQ(question=q, answer=a))
+
+            key = question_key(q)
+            if key not in existing_keys:
+                existing_keys.add(key)
+                new_faqs.append(FAQ(question=q, answer=a))
                 print(f"Added: {q}")
-                count += 1
             else:
                 print(f"Skipped (exists): {q}")
 
-    print(f"Done! Added {count} new FAQs.")
+    await db.add_faqs(new_faqs)
+    await db.disconnect()
+    print(f"Done! Added {len(new_faqs)} new FAQs.")
 
 if __name__ == "__main__":
     asyncio.run(seed_bulk_data())
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Settings and the global database are created when `app` is first imported, so this has to run
+# before: the JSON database and the embedding store live in a throw-away directory, not in data/
+_data_dir = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ["Json_DB_PATH"] = os.path.join(_data_dir, "db.json")
+os.environ["EMBEDDING_STORE_PATH"] = os.path.join(_data_dir, "embeddings")
@@ -0,0 +1,42 @@
+import asyncio
+import time
+import pytest
+from app.services.admission import AdmissionControl, Overloaded
+
+def test_admission_queues_then_sheds():
+    async def scenario():
+        admission = AdmissionControl(max_concurrent=1, max_queue=1)
+        deadline = time.perf_counter() + 5
+        order = []
+
+        async def request(name, deadline):
+            async with admission.admit(deadline):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        first = asyncio.ensure_future(request("first", deadline))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(request("second", deadline))
+        await asyncio.sleep(0)
+        assert (admission.active, admission.queued) == (1, 1)
+
+        # The queue is full: shed without waiting
+        with pytest.raises(Overloaded) as shed:
+            await request("third", deadline)
+        assert shed.value.reason == "queue_full"
+
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert (admission.active, admission.queued) == (0, 0)
+
+        # A queued request whose deadline passes gives up its place
+        holder = asyncio.ensure_future(request("holder", deadline))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as late:
+            await request("late", time.perf_counter() + 0.001)
+        assert late.value.reason == "deadline"
+        await holder
+        assert admission.stats()["shed"] == {"queue_full": 1, "deadline": 1}
+        assert (admission.active, admission.queued, admission.admitted) == (0, 0, 3)
+
+    asyncio.run(scenario())
@@ -31,7 +31,8 @@ def test_crud_faq():
     headers = {"Authorization": f"Bearer {token}"}
 
     # Create
-    response = client.post("/api/faqs", json={"question": "What is AI?", "answer": "Artificial Intelligence."}, headers=headers)
+    response = client.post("/api/faqs", json={"question": "What is AI?", "answer": "Artificial Intelligence.",
+                                              "aliases": ["Define AI"]}, headers=headers)
     assert response.status_code == 200
     faq_id = response.json()["id"]
 
@@ -40,11 +41,255 @@ def test_crud_faq():
     assert response.status_code == 200
     assert len(response.json()) > 0
 
+    # Conditional and paginated listing
+    etag = response.headers["etag"]
+    assert client.get("/api/faqs", headers={"If-None-Match": etag}).status_code == 304
+    page = client.get("/api/faqs", params={"limit": 1, "fields": "id,question"})
+    assert page.status_code == 200
+    assert set(page.json()[0]) == {"id", "question"}
+    if "x-next-cursor" in page.headers:
+        rest = client.get("/api/faqs", params={"limit": 1000, "cursor": page.headers["x-next-cursor"]})
+        assert page.json()[0]["id"] not in [faq["id"] for faq in rest.json()]
+    assert client.get("/api/faqs", params={"fields": "password"}).status_code == 400
+
     # Chat
     chat_res = client.post("/api/chat", json={"query": "What is AI?"})
     assert chat_res.status_code == 200
     assert "Artificial Intelligence" in chat_res.json()["answer"]
 
+    # Alias: answered by exact match
+    chat_res = client.post("/api/chat", json={"query": "define ai"})
+    assert chat_res.json() == {"answer": "Artificial Intelligence.", "confidence": 1.0}
+
     # Delete
     del_res = client.delete(f"/api/faqs/{faq_id}", headers=headers)
     assert del_res.status_code == 200
+    # The corpus changed, so the old ETag no longer matches
+    assert client.get("/api/faqs", headers={"If-None-Match": etag}).status_code == 200
+
+def test_knowledge_bases(monkeypatch):
+    from app.services.knowledge_bases import knowledge_bases
+    token = client.post("/api/admin/login", json={"username": "admin", "password": "admin123"}).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    physics = {"kb_id": "physics"}
+
+    response = client.post("/api/faqs", params=physics, headers=headers,
+                           json={"question": "What is the unit of force?", "answer": "The newton."})
+    assert response.status_code == 200
+    faq_id = response.json()["id"]
+
+    # Each knowledge base only sees its own FAQs
+    assert client.post("/api/chat", params=physics, json={"query": "What is the unit of force?"}).json()["answer"] == "The newton."
+    assert client.post("/api/chat", json={"query": "What is the unit of force?"}).json()["answer"] != "The newton."
+    assert faq_id in [faq["id"] for faq in client.get("/api/faqs", params=physics).json()]
+    assert faq_id not in [faq["id"] for faq in client.get("/api/faqs").json()]
+    assert client.delete(f"/api/faqs/{faq_id}", headers=headers).status_code == 404
+    assert client.get("/api/faqs", params={"kb_id": "../etc"}).status_code == 422
+
+    # Over the memory budget, idle knowledge bases are unloaded and reloaded on next use
+    monkeypatch.setattr(knowledge_bases, "memory_budget", 0)
+    client.get("/api/faqs", params={"kb_id": "chemistry"})
+    assert "physics" not in knowledge_bases.resident
+    evictions = knowledge_bases.evictions
+    assert client.post("/api/chat", params=physics, json={"query": "What is the unit of force?"}).json()["answer"] == "The newton."
+    assert knowledge_bases.evictions > evictions
+
+    assert client.delete(f"/api/faqs/{faq_id}", params=physics, headers=headers).status_code == 200
+
+def shed_every_request(monkeypatch):
+    from app.services.admission import chat_admission
+    # Every slot busy and no room to queue: answered requests skip the model stage entirely
+    monkeypatch.setattr(chat_admission, "max_concurrent", 1)
+    monkeypatch.setattr(chat_admission, "max_queue", 0)
+    monkeypatch.setattr(chat_admission, "active", 1)
+    return chat_admission
+
+def test_chat_load_shedding_semantic(monkeypatch):
+    from app.services.nlp_engine import nlp_engine
+    headers = admin_headers()
+    faq_id = client.post("/api/faqs", headers=headers,
+                         json={"question": "How do I request a hostel room change?", "answer": "Ask the warden."}).json()["id"]
+    monkeypatch.setattr(nlp_engine, "lexical", None)
+    chat_admission = shed_every_request(monkeypatch)
+    shed = chat_admission.stats()["shed"]["queue_full"]
+
+    assert client.post("/api/chat", json={"query": "hello"}).status_code == 200
+    # No index to answer from without the model: rejected at once
+    response = client.post("/api/chat", json={"query": "How do I apply for a hostel room transfer?"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.CHAT_RETRY_AFTER_SECONDS)
+    assert chat_admission.stats()["shed"]["queue_full"] == shed + 1
+
+    assert client.delete(f"/api/faqs/{faq_id}", headers=headers).status_code == 200
+
+def test_chat_load_shedding_hybrid(monkeypatch):
+    from app.services.lexical_index import BM25Index
+    from app.services.nlp_engine import nlp_engine
+    headers = admin_headers()
+    faq_id = client.post("/api/faqs", headers=headers,
+                         json={"question": "How do I request a hostel room change?", "answer": "Ask the warden."}).json()["id"]
+    lexical = BM25Index()
+    lexical.add(faq_id, "How do I request a hostel room change? Ask the warden.")
+    monkeypatch.setattr(nlp_engine, "lexical", lexical)
+    chat_admission = shed_every_request(monkeypatch)
+    degraded = chat_admission.degraded
+
+    # Degraded to "did you mean" suggestions from the BM25 index
+    response = client.post("/api/chat", json={"query": "How do I apply for a hostel room transfer?"})
+    assert response.status_code == 200
+    assert response.json()["confidence"] == 0.0
+    assert "How do I request a hostel room change?" in response.json()["answer"]
+    assert chat_admission.degraded == degraded + 1
+
+    assert client.delete(f"/api/faqs/{faq_id}", headers=headers).status_code == 200
+
+def admin_headers():
+    token = client.post("/api/admin/login", json={"username": "admin", "password": "admin123"}).json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_bulk_import_ndjson_and_csv():
+    headers = admin_headers()
+    ndjson = "\n".join([
+        '{"question": "When does the bulk library open?", "answer": "At 8am."}',
+        '{"question": "when does the BULK library open", "answer": "Duplicate."}',
+        'not json',
+        '{"question": "Is there a bulk cafeteria?"}',
+        '',
+        '{"question": "Where is the bulk gym?", "answer": "Block D."}',
+    ])
+    report = client.post("/api/faqs/bulk", content=ndjson, headers=headers).json()
+    assert (report["status"], report["rows"], report["inserted"], report["skipped"]) == ("done", 5, 2, 1)
+    assert [error["row"] for error in report["errors"]] == [3, 4]
+    assert client.get(f"/api/faqs/bulk/jobs/{report['job_id']}", headers=headers).json() == report
+
+    csv_body = "\r\n".join([
+        "answer,question",
+        '"Ground floor,\nnext to the entrance.",Where is the bulk help desk?',
+        "Block D.,Where is the bulk gym?",  # already imported
+        "only one column",
+    ])
+    report = client.post("/api/faqs/bulk", params={"format": "csv"}, content=csv_body, headers=headers).json()
+    assert (report["rows"], report["inserted"], report["skipped"], report["error_count"]) == (3, 1, 1, 1)
+    assert report["errors"][0]["row"] == 3
+
+    # Imported FAQs are indexed and answered right away
+    answer = client.post("/api/chat", json={"query": "Where is the bulk help desk?"}).json()["answer"]
+    assert answer == "Ground floor,\nnext to the entrance."
+    assert client.post("/api/faqs/bulk", params={"format": "xml"}, content="", headers=headers).status_code == 400
+
+    for faq in client.get("/api/faqs").json():
+        if "bulk" in faq["question"]:
+            assert client.delete(f"/api/faqs/{faq['id']}", headers=headers).status_code == 200
+
+def test_chat_batch(monkeypatch):
+    import asyncio
+    from app.core import database
+    from app.services.nlp_engine import nlp_engine
+
+    headers = admin_headers()
+    questions = [f"Where is the batch lecture hall {n}?" for n in "ABCDE"]
+    ids = [client.post("/api/faqs", json={"question": question, "answer": f"Answer {i}."}, headers=headers).json()["id"]
+           for i, question in enumerate(questions)]
+    on_loop, logged = [], []
+    rank_embeddings = nlp_engine.rank_embeddings
+
+    def rank_off_loop(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return rank_embeddings(*args, **kwargs)
+
+    async def log_queries(logs):
+        logged.extend(logs)
+
+    monkeypatch.setattr(nlp_engine, "rank_embeddings", rank_off_loop)
+    monkeypatch.setattr(database.db, "log_queries", log_queries)
+    queries = ["where is the batch lecture hall b", "Hello", "batch lecture hall", questions[3]]
+
+    results = client.post("/api/chat/batch", json={"queries": queries, "k": 5}).json()["results"]
+    assert [result["query"] for result in results] == queries
+    assert results[0]["answer"] == "Answer 1." and results[0]["suggestions"] == []
+    assert results[1]["confidence"] == 1.0 and results[1]["suggestions"] == []
+    assert results[3]["answer"] == "Answer 3."
+    # Only the query without an exact match is ranked, off the event loop, and may get more than 3 suggestions
+    assert on_loop == [False]
+    suggestions = results[2]["suggestions"]
+    assert 3 < len(suggestions) <= 5 and {s["id"] for s in suggestions} <= set(ids)
+    assert [s["score"] for s in suggestions] == sorted((s["score"] for s in suggestions), reverse=True)
+    assert logged == []
+
+    client.post("/api/chat/batch", json={"queries": queries, "k": 5, "log": True})
+    # FAQ hits and ranked queries are logged, canned replies are not
+    assert [log.query for log in logged] == [queries[0], queries[2], queries[3]]
+
+    for faq_id in ids:
+        assert client.delete(f"/api/faqs/{faq_id}", headers=headers).status_code == 200
+
+def test_chat_during_bulk_import_does_not_re_encode(monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    from app.services.nlp_engine import nlp_engine
+
+    headers = admin_headers()
+    client.post("/api/chat", json={"query": "warm up the index"})
+    encoded = []
+    encode = nlp_engine.encode
+
+    def slow_encode(texts):
+        # FAQ encodings only: chat queries go through the batch encoder, which holds the original method
+        encoded.append(len(texts))
+        time.sleep(0.3)
+        return encode(texts)
+
+    monkeypatch.setattr(nlp_engine, "encode", slow_encode)
+    ndjson = "\n".join(f'{{"question": "Concurrent import question {i}?", "answer": "Answer {i}."}}' for i in range(5))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            importing = asyncio.ensure_future(async_client.post("/api/faqs/bulk", content=ndjson, headers=headers))
+            await asyncio.sleep(0.15)  # the batch is written and being encoded
+            chat = await async_client.post("/api/chat", json={"query": "What about the concurrent import?"})
+            assert chat.status_code == 200
+            assert (await importing).json()["inserted"] == 5
+
+    asyncio.run(scenario())
+    assert encoded == [5]  # by the import only
+    for faq in client.get("/api/faqs").json():
+        if faq["question"].startswith("Concurrent import"):
+            client.delete(f"/api/faqs/{faq['id']}", headers=headers)
+
+def test_chat_during_faq_write_is_not_cached(monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    from app.services.nlp_engine import nlp_engine
+
+    headers = admin_headers()
+    client.post("/api/chat", json={"query": "warm up the index"})
+    encode = nlp_engine.encode
+
+    def slow_encode(texts):
+        time.sleep(0.3)
+        return encode(texts)
+
+    monkeypatch.setattr(nlp_engine, "encode", slow_encode)
+    query = {"query": "where write-window gymnasium located"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            creating = asyncio.ensure_future(async_client.post(
+                "/api/faqs", json={"question": "Where is the write-window gymnasium located?", "answer": "Block G."},
+                headers=headers))
+            await asyncio.sleep(0.15)  # the FAQ is stored and being encoded
+            assert (await async_client.post("/api/chat", json=query)).json()["answer"] != "Block G."
+            return (await creating).json()["id"]
+
+    faq_id = asyncio.run(scenario())
+    # The answer given while the index lagged behind was not cached under the new version
+    assert client.post("/api/chat", json=query).json()["answer"] == "Block G."
+    assert client.delete(f"/api/faqs/{faq_id}", headers=headers).status_code == 200
@@ -0,0 +1,72 @@
+import asyncio
+import numpy as np
+import pytest
+from app.services.batch_encoder import BatchEncoder
+
+class RecordingEncoder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise ValueError("model failed")
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+def run(encoder, scenario):
+    async def wrapped():
+        try:
+            return await scenario()
+        finally:
+            await encoder.stop()
+    return asyncio.run(wrapped())
+
+def test_concurrent_queries_share_a_batch():
+    encode_fn = RecordingEncoder()
+    encoder = BatchEncoder(encode_fn, max_batch_size=32, max_wait_ms=20)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    embeddings = run(encoder, lambda: asyncio.gather(*(encoder.encode(text) for text in texts)))
+    assert encode_fn.batches == [texts]
+    # Each caller gets its own row back
+    assert [float(e[0]) for e in embeddings] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert (encoder.batches, encoder.encoded) == (1, 5)
+
+def test_batches_respect_max_size_and_max_wait():
+    encode_fn = RecordingEncoder()
+    encoder = BatchEncoder(encode_fn, max_batch_size=4, max_wait_ms=5)
+
+    async def scenario():
+        await asyncio.gather(*(encoder.encode(str(i)) for i in range(10)))
+        # A query arriving after the wait window goes into a batch of its own
+        await encoder.encode("late")
+
+    run(encoder, scenario)
+    assert [len(batch) for batch in encode_fn.batches] == [4, 4, 2, 1]
+
+def test_encoder_error_reaches_every_waiter():
+    encoder = BatchEncoder(RecordingEncoder(fail=True), max_batch_size=8, max_wait_ms=5)
+
+    async def scenario():
+        return await asyncio.gather(*(encoder.encode(text) for text in ("a", "b", "c")), return_exceptions=True)
+
+    results = run(encoder, scenario)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert encoder.batches == 0
+
+def test_stop_fails_queued_queries():
+    encoder = BatchEncoder(RecordingEncoder(), max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        # One query still in the queue, one already taken into the batch being collected
+        collecting = asyncio.ensure_future(encoder.encode("a"))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        queued = asyncio.ensure_future(encoder.encode("b"))
+        await asyncio.sleep(0)
+        await encoder.stop()
+        for pending in (collecting, queued):
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(pending, 1)
+
+    run(encoder, scenario)
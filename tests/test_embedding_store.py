@@ -0,0 +1,36 @@
+import os
+import numpy as np
+from app.services.embedding_store import EmbeddingStore, content_hash
+
+def vectors(n, dim=4, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+def test_save_keeps_one_generation_and_reloads(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings"), "model", 4)
+    assert not store.load()
+    hashes = [content_hash(f"q{i}", f"a{i}") for i in range(3)]
+    store.save(hashes, vectors(3))
+    store.save(hashes[:2], vectors(2, seed=1))
+
+    reloaded = EmbeddingStore(store.path, "model", 4)
+    assert reloaded.load()
+    assert reloaded.lookup(hashes) == [0, 1, None]
+    assert np.array_equal(reloaded.vectors, vectors(2, seed=1))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".npy")]) == 2
+    assert not EmbeddingStore(store.path, "other-model", 4).load()
+
+def test_stores_sharing_a_path_prefix_do_not_remove_each_other(tmp_path):
+    # The per-knowledge-base stores are named <EMBEDDING_STORE_PATH>-kb-<id>, and ids may prefix each other
+    paths = [str(tmp_path / name) for name in ("embeddings", "embeddings-kb-physics", "embeddings-kb-physics-2")]
+    stores = [EmbeddingStore(path, "model", 4) for path in paths]
+    for seed, store in enumerate(stores):
+        store.save([content_hash(store.path, "")], vectors(1, seed=seed))
+    # A new generation of the shorter-named stores only replaces their own files
+    for seed, store in enumerate(stores[:2]):
+        store.save([content_hash(store.path, "")], vectors(1, seed=seed))
+
+    for seed, path in enumerate(paths):
+        store = EmbeddingStore(path, "model", 4)
+        assert store.load()
+        assert np.array_equal(store.vectors, vectors(1, seed=seed))
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".npy")]) == 2 * len(paths)
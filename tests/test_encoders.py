@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from app.services.encoders import HashEncoder, create_encoder, parity_report
+
+class FixedEncoder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts):
+        return self.vectors[:len(texts)]
+
+def test_parity_report_measures_drift_and_top1_agreement():
+    reference = np.eye(3, dtype=np.float32)
+    tilted = reference + 0.1 * np.roll(reference, 1, axis=1)
+    tilted /= np.linalg.norm(tilted, axis=1, keepdims=True)
+
+    report = parity_report(FixedEncoder(reference), FixedEncoder(tilted), ["a", "b", "c"], corpus=reference)
+    assert report["texts"] == 3
+    assert 0 < report["mean_drift"] == pytest.approx(report["max_drift"])
+    assert report["top1_agreement"] == 1.0
+
+    same = parity_report(FixedEncoder(reference), FixedEncoder(reference), ["a", "b", "c"])
+    assert same["max_drift"] == pytest.approx(0.0)
+
+def test_unknown_encoder_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_encoder("onnx", "some-model")
+
+def test_hash_encoder_is_deterministic_and_typo_tolerant():
+    encoder = create_encoder("hash", "unused")
+    encoder.load()
+    first = encoder.encode(["How do I reset my password?", "library hours"])
+    second = HashEncoder().encode(["How do I reset my password?", "library hours"])
+    assert np.array_equal(first, second)
+
+    typo = encoder.encode(["how do i reset my pasword"])[0]
+    assert typo @ first[0] > 0.8 > typo @ first[1]
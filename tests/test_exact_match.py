@@ -0,0 +1,39 @@
+from app.models.faq import FAQ
+from app.services.exact_match import ExactMatcher
+
+def test_exact_matcher_questions_aliases_and_canned():
+    matcher = ExactMatcher({"hello": "Hi there!"})
+    library = FAQ(id="1", question="When does the library open?", answer="8am", aliases=["Library hours"])
+    matcher.build([library, FAQ(id="2", question="How do I reset my password?", answer="Portal")])
+
+    assert matcher.lookup("  HELLO!! ") == ("canned", "Hi there!")
+    assert matcher.lookup("when does the library open") == ("question", "1")
+    assert matcher.lookup("library hours?") == ("alias", "1")
+    assert matcher.lookup("library") is None
+
+    # Aliases follow FAQ updates; removed FAQs stop matching
+    matcher.update_faq(library.model_copy(update={"aliases": ["Opening times"]}))
+    assert matcher.lookup("library hours") is None
+    assert matcher.lookup("opening times") == ("alias", "1")
+    matcher.remove_faq("2")
+    assert matcher.lookup("How do I reset my password?") is None
+
+    stats = matcher.stats()
+    assert stats["lookups"] == 7
+    assert stats["hits"] == {"canned": 1, "question": 1, "alias": 2}
+    assert stats["hit_rate"] == 4 / 7
+
+def test_shared_phrasing_passes_to_the_next_faq():
+    matcher = ExactMatcher({})
+    matcher.build([
+        FAQ(id="1", question="Where is the gym?", answer="Block G."),
+        FAQ(id="2", question="Gym location", answer="Block G, ground floor.", aliases=["Where is the gym"]),
+    ])
+    assert matcher.lookup("where is the gym") == ("question", "1")
+
+    # The first FAQ answers a shared phrasing; removing it leaves the other one matching
+    matcher.remove_faq("1")
+    assert matcher.lookup("where is the gym") == ("alias", "2")
+    matcher.update_faq(FAQ(id="2", question="Gym location", answer="Block G."))
+    assert matcher.lookup("where is the gym") is None
+    assert matcher.stats()["entries"] == 1
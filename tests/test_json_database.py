@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import JsonDatabase
+from app.models.faq import FAQ, QueryLog
+
+def make_db(tmp_path, monkeypatch, compact_every=1000):
+    monkeypatch.setattr(settings, "Json_DB_PATH", str(tmp_path / "db.json"))
+    monkeypatch.setattr(settings, "JSON_DB_COMPACT_EVERY", compact_every)
+    return JsonDatabase()
+
+def test_journal_replay(tmp_path, monkeypatch):
+    async def scenario():
+        db = make_db(tmp_path, monkeypatch)
+        faq, _ = await db.add_faq(FAQ(question="Where is the library?", answer="Building C."))
+        await db.add_faq(FAQ(question="Is there Wi-Fi?", answer="Yes."))
+        await db.update_faq(faq.id, {"answer": "Academic Block."})
+        await db.log_query(QueryLog(query="library", response="Academic Block.", score=0.9))
+
+        # Nothing but the journal was written, and a fresh instance replays it
+        assert os.path.getsize(db.journal_path) > 0
+        reopened = make_db(tmp_path, monkeypatch)
+        faqs = await reopened.get_all_faqs()
+        assert [f.answer for f in faqs] == ["Academic Block.", "Yes."]
+
+        assert (await reopened.delete_faq(faq.id))[0]
+        # The first instance sees the other instance's write
+        assert await db.get_faq(faq.id) is None
+
+    asyncio.run(scenario())
+
+def test_compaction(tmp_path, monkeypatch):
+    async def scenario():
+        db = make_db(tmp_path, monkeypatch, compact_every=3)
+        for i in range(4):
+            await db.add_faq(FAQ(question=f"Question {i}?", answer=f"Answer {i}."))
+
+        with open(db.file_path) as f:
+            assert len(json.load(f)["faqs"]) == 3
+        assert len(await make_db(tmp_path, monkeypatch).get_all_faqs()) == 4
+
+        await db.disconnect()
+        assert os.path.getsize(db.journal_path) == 0
+        with open(db.file_path) as f:
+            assert len(json.load(f)["faqs"]) == 4
+
+    asyncio.run(scenario())
+
+def test_log_rollups_survive_retention(tmp_path, monkeypatch):
+    async def scenario():
+        db = make_db(tmp_path, monkeypatch)
+        now = datetime.utcnow()
+        await db.log_queries([
+            QueryLog(query="Library hours?", response="8am.", score=0.9, outcome="hit"),
+            QueryLog(query="parking  permit", response="Sorry...", score=0.1, outcome="no_answer"),
+            QueryLog(query="Parking permit!", response="Did you mean...", score=0.4, outcome="fallback",
+                     timestamp=now - timedelta(days=10)),
+        ])
+
+        # Old raw logs are purged (also in other instances) but stay counted in the rollups
+        assert await db.purge_logs(now - timedelta(days=1)) == 1
+        await db.disconnect()
+        reopened = make_db(tmp_path, monkeypatch)
+        summary = await reopened.get_log_rollups(hours=2, top=5)
+        assert len(reopened._logs) == 2
+        assert summary["totals"] == {"total": 3, "hit": 1, "fallback": 1, "no_answer": 1}
+        assert sum(hour["total"] for hour in summary["hours"]) == 2
+        assert summary["top_unanswered"] == [{"query": "parking permit", "count": 2}]
+        assert sum(bucket["count"] for bucket in summary["confidence_histogram"]) == 3
+
+    asyncio.run(scenario())
+
+def test_reads_during_compaction_apply_nothing_twice(tmp_path, monkeypatch):
+    async def scenario():
+        db = make_db(tmp_path, monkeypatch, compact_every=50)
+        done = False
+
+        async def reader():
+            while not done:
+                await db.get_faq_version()
+                await asyncio.sleep(0)
+
+        reading = asyncio.ensure_future(reader())
+        for i in range(200):
+            await db.log_queries([QueryLog(query=f"query {i}", response="r", score=0.5)])
+        done = True
+        await reading
+
+        assert len(db._logs) == 200
+        assert (await db.get_log_rollups())["totals"]["total"] == 200
+
+    asyncio.run(scenario())
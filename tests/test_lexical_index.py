@@ -0,0 +1,39 @@
+import numpy as np
+from app.services.lexical_index import BM25Index, tokenize
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I reset my Password?") == ["reset", "password"]
+
+def test_bm25_search_and_incremental_updates():
+    index = BM25Index()
+    index.add("1", "When is the library open? The library opens at 8am.")
+    index.add("2", "How do I reset my password? Use the student portal.")
+    index.add("3", "Where is the cafeteria? Next to the library.")
+
+    ids, scores = index.search("library hours", n=5)
+    assert ids == ["1", "3"]
+    assert scores[0] > scores[1] > 0
+    assert index.search("parking", n=5)[0] == []
+
+    # Replacing a document updates its postings; removing one drops them
+    index.add("3", "Where is the cafeteria? In the main building.")
+    assert index.search("library", n=5)[0] == ["1"]
+    assert index.remove("1")
+    assert not index.remove("1")
+    assert index.search("library", n=5)[0] == []
+    assert "library" not in index.postings
+    assert len(index) == 2
+
+    assert list(index.score_ids("reset password", ["2", "3", "unknown"]) > 0) == [True, False, False]
+
+def test_bm25_search_sums_terms_per_document():
+    index = BM25Index()
+    index.add("1", "library opening hours")
+    index.add("2", "library card")
+    index.add("3", "gym opening hours")
+    index.add("4", "cafeteria menu")
+
+    # Documents matching several query terms add up their scores, the same as score_ids
+    ids, scores = index.search("library opening hours", n=10)
+    assert ids == ["1", "3", "2"]
+    assert np.allclose(scores, index.score_ids("library opening hours", ids))
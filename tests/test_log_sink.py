@@ -0,0 +1,59 @@
+import asyncio
+from app.models.faq import QueryLog
+from app.services.log_sink import QueryLogSink
+
+class SlowDatabase:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    async def log_queries(self, logs):
+        await asyncio.sleep(self.delay)
+        self.batches.append([log.query for log in logs])
+
+def make_log(i):
+    return QueryLog(query=f"query {i}", response="answer", score=0.5)
+
+def test_logs_are_written_in_batches():
+    async def scenario():
+        db = SlowDatabase()
+        sink = QueryLogSink(max_queue=100, batch_size=3, flush_interval=60)
+        sink.start(db)
+        for i in range(7):
+            assert sink.submit(make_log(i))
+        await sink.stop()
+        return db, sink
+
+    db, sink = asyncio.run(scenario())
+    assert [len(batch) for batch in db.batches] == [3, 3, 1]
+    assert [query for batch in db.batches for query in batch] == [f"query {i}" for i in range(7)]
+    assert (sink.written, sink.batches, sink.failed) == (7, 3, 0)
+
+def test_stop_lets_the_write_in_progress_finish():
+    async def scenario():
+        db = SlowDatabase(delay=0.05)
+        sink = QueryLogSink(max_queue=100, batch_size=2, flush_interval=60)
+        sink.start(db)
+        sink.submit(make_log(0))
+        sink.submit(make_log(1))  # a full batch: the worker starts writing it
+        await asyncio.sleep(0.01)
+        sink.submit(make_log(2))
+        await sink.stop()
+        assert not sink.running
+        return db, sink
+
+    db, sink = asyncio.run(scenario())
+    assert db.batches == [["query 0", "query 1"], ["query 2"]]
+    assert sink.written == 3
+
+def test_full_queue_drops_new_logs():
+    async def scenario():
+        sink = QueryLogSink(max_queue=2, batch_size=10, flush_interval=60)
+        sink.start(SlowDatabase())
+        accepted = [sink.submit(make_log(i)) for i in range(3)]
+        await sink.stop()
+        return accepted, sink
+
+    accepted, sink = asyncio.run(scenario())
+    assert accepted == [True, True, False]
+    assert (sink.submitted, sink.dropped, sink.written) == (2, 1, 2)
@@ -0,0 +1,25 @@
+from app.services.metrics import Registry
+
+def test_prometheus_text_rendering():
+    registry = Registry()
+    stages = registry.histogram("stage_seconds", "Stage time.", [0.01, 0.1], ["stage"])
+    answers = registry.counter("answers_total", "Answers.", ["outcome"])
+    registry.register_collector(lambda: [("queue_depth", "gauge", "Queued.", 3)])
+
+    stages.observe(0.005, "spell")
+    stages.observe(0.05, "spell")
+    stages.observe(2.0, "spell")
+    with stages.time("rank"):
+        pass
+    answers.inc("hit")
+    answers.inc("hit")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="spell",le="0.01"} 1' in lines
+    assert 'stage_seconds_bucket{stage="spell",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="spell",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="spell"} 3' in lines
+    assert 'stage_seconds_count{stage="rank"} 1' in lines
+    assert 'answers_total{outcome="hit"} 2' in lines
+    assert "queue_depth 3" in lines
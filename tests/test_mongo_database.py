@@ -0,0 +1,180 @@
+import asyncio
+import copy
+import itertools
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from app.core import database
+from app.core.config import settings
+from app.core.database import MongoDatabase
+from app.models.faq import FAQ
+
+# Minimal in-memory stand-in for the motor API the app uses (mongomock-style):
+# equality and $in filters, projections, $set/$inc updates and named indexes.
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict) and "$in" in condition:
+            if doc.get(field) not in condition["$in"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+def project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if projection:
+        if projection.get("_id") == 0:
+            doc.pop("_id", None)
+        kept = [field for field, keep in projection.items() if keep and field != "_id"]
+        if kept:
+            doc = {field: doc[field] for field in ["_id"] + kept if field in doc}
+    return doc
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.batch = None
+
+    def batch_size(self, n):
+        self.batch = n
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeCollection:
+    _ids = itertools.count()
+
+    def __init__(self):
+        self.docs = []
+        self.indexes = {}
+        self.cursors = []
+
+    async def create_index(self, keys, **options):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = options.pop("name", "_".join(f"{field}_{order}" for field, order in keys))
+        if name in self.indexes and self.indexes[name] != (keys, options):
+            raise OperationFailure("Index already exists with different options", code=85)
+        self.indexes[name] = (keys, options)
+        return name
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+    def find(self, query=None, projection=None):
+        cursor = FakeCursor([project(doc, projection) for doc in self.docs if matches(doc, query or {})])
+        self.cursors.append(cursor)
+        return cursor
+
+    async def find_one(self, query, projection=None):
+        return next((project(doc, projection) for doc in self.docs if matches(doc, query)), None)
+
+    async def insert_one(self, doc):
+        self.docs.append({"_id": next(self._ids), **doc})
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE,
+                                  upsert=False):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        if doc is None and not upsert:
+            return None
+        before = project(doc, projection) if doc is not None else None
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return before if return_document == ReturnDocument.BEFORE else project(doc, projection)
+
+    async def find_one_and_delete(self, query, projection=None):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        if doc is not None:
+            self.docs.remove(doc)
+            return project(doc, projection)
+        return None
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+    def __getattr__(self, name):
+        return self[name]
+
+class FakeClient:
+    def __init__(self, url, **options):
+        self.options = options
+        self.databases = FakeDatabase()
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, FakeDatabase())
+
+    def close(self):
+        pass
+
+def connect(monkeypatch):
+    monkeypatch.setattr(database, "AsyncIOMotorClient", FakeClient)
+    db = MongoDatabase()
+    asyncio.run(db.connect())
+    return db
+
+def test_connect_configures_pool_and_indexes(monkeypatch):
+    monkeypatch.setattr(settings, "MONGO_MAX_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "MONGO_SOCKET_TIMEOUT_MS", 0)
+    db = connect(monkeypatch)
+    assert db.client.options["maxPoolSize"] == 20
+    assert "socketTimeoutMS" not in db.client.options
+    assert db.db.faqs.indexes["id_1"] == ([("id", 1)], {"unique": True})
+    assert db.db.logs.indexes["timestamp_1"] == ([("timestamp", 1)], {})
+
+    # Turning the TTL on replaces the plain timestamp index
+    monkeypatch.setattr(settings, "MONGO_LOG_TTL_DAYS", 7)
+    asyncio.run(db.create_indexes())
+    assert db.db.logs.indexes["timestamp_1"] == ([("timestamp", 1)], {"expireAfterSeconds": 7 * 86400})
+
+def test_faq_reads_and_updates(monkeypatch):
+    db = connect(monkeypatch)
+
+    async def scenario():
+        faq, _ = await db.add_faq(FAQ(question="Where is the library?", answer="Building C."))
+        await db.add_faq(FAQ(kb_id="physics", question="Unit of force?", answer="The newton."))
+
+        faqs = await db.get_all_faqs(kb_id="default")
+        assert [f.id for f in faqs] == [faq.id]
+        assert db.db.faqs.cursors[-1].batch == settings.MONGO_BATCH_SIZE
+        assert all("_id" not in doc for doc in db.db.faqs.cursors[-1].docs)
+
+        version = await db.get_faq_version()
+        updated, produced = await db.update_faq(faq.id, {"answer": "Academic Block."})
+        assert produced == version + 1
+        assert updated.answer == "Academic Block." and updated.question == faq.question
+        assert (await db.get_faq(faq.id)).answer == "Academic Block."
+        assert await db.get_faq_version() == version + 1
+
+        # Setting the same values finds the FAQ but does not change the corpus version
+        unchanged, produced = await db.update_faq(faq.id, {"answer": "Academic Block."})
+        assert unchanged.id == faq.id and produced is None
+        assert await db.get_faq_version() == version + 1
+        assert await db.update_faq("missing", {"answer": "x"}) == (None, None)
+
+        # Each knowledge base has its own version
+        physics = await db.get_faq_version("physics")
+        assert await db.delete_faq(faq.id) == (True, version + 2)
+        assert await db.delete_faq(faq.id) == (False, None)
+        assert await db.get_faq_version("physics") == physics
+        _, produced = await db.add_faqs([FAQ(kb_id="physics", question="Unit of work?", answer="The joule.")])
+        assert produced == physics + 1
+        assert await db.get_faq_version() == version + 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+import glob
+import os
+from app.core.config import settings
+from app.models.faq import FAQ
+from app.services.embedding_store import EmbeddingStore
+from app.services.nlp_engine import NLPEngine
+
+FAQS = [
+    FAQ(question="Where is the library?", answer="Building C."),
+    FAQ(question="When does the gym open?", answer="At 7am."),
+]
+
+def engine(monkeypatch, tmp_path) -> NLPEngine:
+    monkeypatch.setattr(settings, "ENCODER_BACKEND", "hash")
+    monkeypatch.setattr(settings, "INFERENCE_PROCESSES", 0)
+    return NLPEngine("unused", store_path=str(tmp_path / "embeddings"))
+
+def test_build_index_serves_from_the_store(monkeypatch, tmp_path):
+    engine(monkeypatch, tmp_path).build_index(FAQS)
+    # A second worker maps the same generation instead of encoding
+    second = engine(monkeypatch, tmp_path)
+    second.build_index(FAQS)
+    assert second.index.nbytes == 0  # the shared memory map, no private copy
+    assert second.rank("Where is the library?", k=1).ids[0] == FAQS[0].id
+
+def test_build_index_survives_losing_its_generation(monkeypatch, tmp_path):
+    save = EmbeddingStore.save
+
+    def save_then_lose(store, hashes, vectors):
+        # Another worker's cleanup removes the new generation before it is mapped
+        save(store, hashes, vectors)
+        for path in glob.glob(f"{store.path}-*.npy"):
+            os.remove(path)
+        store.load()
+
+    monkeypatch.setattr(EmbeddingStore, "save", save_then_lose)
+    built = engine(monkeypatch, tmp_path)
+    built.build_index(FAQS)
+    assert built.store.vectors is None
+    assert len(built.index) == 2
+    assert built.rank("When does the gym open?", k=1).ids[0] == FAQS[1].id
+
+def test_compute_similarity_does_not_need_the_model_in_process(monkeypatch, tmp_path):
+    scorer = engine(monkeypatch, tmp_path)
+    # With the inference pool the model lives in worker processes only
+    monkeypatch.setattr(scorer.encoder, "model", None)
+    results = scorer.compute_similarity("library hours", ["When does the gym open?", "What are the library hours?"])
+    assert [index for index, _ in results] == [1, 0]
+    assert results[0][1] > results[1][1]
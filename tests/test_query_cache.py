@@ -0,0 +1,41 @@
+import time
+from app.services.query_cache import LRUCache, QueryCache
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.expirations == 1 and len(cache) == 1
+
+def test_responses_are_invalidated_per_knowledge_base():
+    cache = QueryCache(response_size=10, embedding_size=10, ttl_seconds=0)
+    cache.put_response("library hours", 1, "default answer")
+    cache.put_response("library hours", 1, "physics answer", kb_id="physics")
+    assert cache.get_response("library hours", 1) == "default answer"
+    assert cache.get_response("library hours", 1, kb_id="physics") == "physics answer"
+
+    # A write to the physics knowledge base only drops its own entries
+    assert cache.get_response("library hours", 2, kb_id="physics") is None
+    assert len(cache.responses) == 1
+    assert cache.get_response("library hours", 1) == "default answer"
+    assert cache.stats()["corpus_versions"] == {"default": 1, "physics": 2}
+
+def test_responses_are_invalidated_by_the_spell_vocabulary():
+    cache = QueryCache(response_size=10, embedding_size=10, ttl_seconds=0)
+    cache.put_response("libary hours", 1, "physics answer", kb_id="physics", vocabulary=1)
+    assert cache.get_response("libary hours", 1, kb_id="physics", vocabulary=1) == "physics answer"
+
+    # The default knowledge base's vocabulary changed: corrections of every knowledge base may differ
+    assert cache.get_response("libary hours", 1, kb_id="physics", vocabulary=2) is None
+    assert len(cache.responses) == 0
+    assert cache.stats()["vocabulary_version"] == 2
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import JsonDatabase
+from app.core.repository import FAQRepository, FAQSnapshot
+from app.models.faq import FAQ
+
+def make_faqs(n):
+    start = datetime(2024, 1, 1)
+    return [FAQ(id=f"faq-{i}", question=f"Question {i}?", answer=f"Answer {i}.", created_at=start + timedelta(minutes=i))
+            for i in range(n)]
+
+def test_snapshot_columns_and_copies():
+    faqs = make_faqs(3)
+    snapshot = FAQSnapshot.from_faqs(1, faqs)
+    assert snapshot.ids == ["faq-0", "faq-1", "faq-2"]
+    assert snapshot.questions[snapshot.positions["faq-1"]] == "Question 1?"
+    assert snapshot.faq(2).model_dump() == faqs[2].model_dump()
+    assert snapshot.records()[0]["answer"] == "Answer 0."
+
+    # Copy-on-write: replacing, adding and removing leave the original untouched
+    changed = snapshot.with_faqs(2, [faqs[1].model_copy(update={"answer": "New."}), *make_faqs(4)[3:]])
+    assert (changed.version, len(changed), changed.answers[1]) == (2, 4, "New.")
+    assert snapshot.answers[1] == "Answer 1." and len(snapshot) == 3
+    assert changed.etag != snapshot.etag
+    assert FAQSnapshot.from_faqs(9, faqs).etag == snapshot.etag  # content, not version
+
+    removed = changed.without_faq(3, "faq-0")
+    assert removed.ids == ["faq-1", "faq-2", "faq-3"] and "faq-0" not in removed
+    assert removed.positions == {"faq-1": 0, "faq-2": 1, "faq-3": 2}
+
+    # Keyset pages in creation order
+    positions, after = removed.page(None, 2)
+    assert [removed.ids[i] for i in positions] == ["faq-1", "faq-2"]
+    positions, after = removed.page(after, 2)
+    assert [removed.ids[i] for i in positions] == ["faq-3"] and after is None
+
+class CountingDatabase(JsonDatabase):
+    loads = 0
+
+    async def get_all_faqs(self, kb_id=None):
+        self.loads += 1
+        return await super().get_all_faqs(kb_id)
+
+def test_repository_versions_and_external_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "Json_DB_PATH", str(tmp_path / "db.json"))
+
+    async def scenario():
+        db = CountingDatabase()
+        other_worker = JsonDatabase()
+        repository = FAQRepository(db, refresh_seconds=3600)
+
+        first = await repository.snapshot()
+        assert (first.version, len(first), db.loads) == (1, 0, 1)
+
+        # Our own writes update the snapshot in place: no reload
+        library, wifi = make_faqs(2)
+        await repository.add_faq(library)
+        await repository.update_faq(library.id, {"answer": "Building C."})
+        snapshot = await repository.snapshot()
+        assert (snapshot.version, snapshot.answers, db.loads) == (3, ["Building C."], 1)
+        assert len(first) == 0  # readers holding the old snapshot are unaffected
+
+        # Another worker writes just before us: its FAQ must not be lost with our version bump
+        await other_worker.add_faq(wifi)
+        await repository.delete_faq(library.id)
+        snapshot = await repository.snapshot()
+        assert snapshot.ids == [wifi.id]
+        assert db.loads == 2
+
+        # Without our own writes, outside changes show up after the refresh interval
+        repository.refresh_seconds = 0
+        await other_worker.add_faq(FAQ(question="Parking?", answer="Lot B."))
+        assert len(await repository.snapshot()) == 2
+        assert (await repository.snapshot()).version == (await repository.snapshot()).version
+
+        # Writes to another knowledge base leave this one's snapshot alone
+        loads, version = db.loads, (await repository.snapshot()).version
+        await other_worker.add_faq(FAQ(kb_id="physics", question="Unit of force?", answer="The newton."))
+        physics = FAQRepository(db, refresh_seconds=3600, kb_id="physics")
+        assert len(await physics.snapshot()) == 1
+        await physics.add_faq(FAQ(kb_id="physics", question="Unit of work?", answer="The joule."))
+        assert (await repository.snapshot()).version == version
+        assert db.loads == loads + 1  # the physics snapshot only
+
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+from app.models.faq import FAQ
+from app.services.spell_checker import SpellCorrector, edit_distance
+
+corrector = SpellCorrector()
+
+def test_edit_distance():
+    assert edit_distance("library", "library", 2) == 0
+    assert edit_distance("libary", "library", 2) == 1
+    assert edit_distance("hostle", "hostel", 2) == 1  # transposition
+    assert edit_distance("abc", "xyzabc", 2) == 3  # capped at max + 1
+
+def test_corrects_typos_and_keeps_punctuation():
+    assert corrector.correct_text("exam shedule?") == "exam schedule?"
+    assert corrector.correct_text("What is AI?") == "What is AI?"
+
+def test_faq_vocabulary_is_incremental():
+    faq = FAQ(question="Where do I get a bonafide certificate?", answer="From the Admin Office.")
+    version = corrector.vocabulary_version
+    corrector.update_faq(faq)
+    assert corrector.correct_text("bonafied certificate") == "bonafide certificate"
+    corrector.update_faq(faq)  # same words: corrections cannot change
+    assert corrector.vocabulary_version == version + 1
+
+    corrector.remove_faq(faq.id)
+    assert "bonafide" not in corrector.faq_words
+    assert corrector.vocabulary_version == version + 2
@@ -0,0 +1,67 @@
+import numpy as np
+from app.services.vector_index import ExactIndex, IVFIndex, QuantizedIndex, recall_report
+
+def random_vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_exact_index_upsert_and_remove():
+    vectors = random_vectors(3)
+    index = ExactIndex(32)
+    index.add(["a", "b", "c"], vectors)
+
+    ids, scores = index.search(vectors[1], k=1)
+    assert ids == ["b"]
+    assert abs(scores[0] - 1.0) < 1e-5
+
+    # Replace "b" with "c"'s vector, then remove "a" (the last row moves into its slot)
+    index.add(["b"], vectors[2:3])
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert len(index) == 2
+    assert set(index.search(vectors[2], k=2)[0]) == {"b", "c"}
+
+def test_ivf_index_matches_exact_when_probing_every_list():
+    vectors = random_vectors(2000)
+    index = IVFIndex(32, n_lists=16, n_probe=16, min_train_size=500)
+    index.add([str(i) for i in range(2000)], vectors)
+    assert index.centroids is not None
+
+    for i in range(0, 2000, 4):
+        index.remove(str(i))
+
+    report = recall_report(index, vectors[:20], k=5)
+    assert report["recall@5"] == 1.0
+    assert report["size"] == 1500
+
+def test_search_batch_matches_single_searches():
+    vectors = random_vectors(300)
+    queries = random_vectors(10, seed=1)
+    index = ExactIndex(32)
+    index.add([str(i) for i in range(300)], vectors)
+
+    for query, (ids, scores) in zip(queries, index.search_batch(queries, k=5, chunk=3)):
+        expected_ids, expected_scores = index.search(query, k=5)
+        assert ids == expected_ids
+        assert np.allclose(scores, expected_scores)
+
+def test_quantized_index_close_to_exact_and_rerank_restores_exact_scores():
+    vectors = random_vectors(500)
+    queries = random_vectors(20, seed=2)
+    ids = [str(i) for i in range(500)]
+    exact = ExactIndex(32)
+    exact.add(ids, vectors)
+
+    for precision in ("float16", "int8"):
+        index = QuantizedIndex(32, precision=precision)
+        index.add(ids, vectors)
+        assert index.nbytes < exact.nbytes
+        assert recall_report(index, queries, k=5, exact=exact)["recall@5"] >= 0.9
+
+        reranked = QuantizedIndex(32, precision=precision, rerank=20)
+        reranked.attach(ids, vectors)
+        for query, (found_ids, found_scores) in zip(queries, reranked.search_batch(queries, k=3)):
+            expected_ids, expected_scores = exact.search(query, k=3)
+            assert found_ids == expected_ids
+            assert np.allclose(found_scores, expected_scores)
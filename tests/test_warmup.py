@@ -0,0 +1,63 @@
+import asyncio
+import httpx
+from app import main
+from app.core.config import settings
+from app.core.repository import FAQSnapshot
+from app.models.faq import FAQ
+from app.services.nlp_engine import nlp_engine
+from app.services.warmup import WarmUp
+
+class FlakyRepository:
+    """
+    Fails the first snapshot (database not up yet), then blocks the second until released.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def snapshot(self):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("database unavailable")
+        await self.release.wait()
+        return FAQSnapshot.from_faqs(1, [FAQ(question="Where is the library?", answer="Building C.")])
+
+def test_health_and_readiness_through_warm_up(monkeypatch):
+    warm_up = WarmUp(retry_seconds=0.01, max_retry_seconds=0.01)
+    monkeypatch.setattr(main, "warm_up", warm_up)
+    monkeypatch.setattr(nlp_engine, "index_ready", False)
+    # No model download: if no earlier test has loaded the encoder, load the hash one
+    monkeypatch.setattr(settings, "ENCODER_BACKEND", "hash")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Before: alive, not ready
+            assert (await client.get("/healthz")).status_code == 200
+            assert (await client.get("/readyz")).status_code == 503
+
+            repository = FlakyRepository()
+            warm_up.start(repository)
+            async def second_attempt():
+                while repository.calls < 2:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(second_attempt(), timeout=30)
+            # During the retry: still alive, not ready, the first failure reported
+            assert (await client.get("/healthz")).status_code == 200
+            response = await client.get("/readyz")
+            assert response.status_code == 503
+            assert response.json()["warmup_attempts"] == 2
+
+            # After: ready, error cleared
+            repository.release.set()
+            await asyncio.wait_for(warm_up.task, timeout=30)
+            response = await client.get("/readyz")
+            assert response.status_code == 200
+            assert response.json()["error"] is None
+            await warm_up.stop()
+
+    asyncio.run(scenario())
+    # The index now holds the fake corpus: make the next request resync it with the real one
+    nlp_engine.corpus_version = None